@@ -1,16 +1,17 @@
 # -*- mode: python ; coding: utf-8 -*-
+# Run `python build_snapshot.py` first to produce puzzles.snapshot
 
 
 a = Analysis(
     ['app_launcher.py'],
     pathex=[],
     binaries=[],
-    datas=[('puzzles.csv', '.'), ('.env', '.'), ('templates', 'templates')],
-    hiddenimports=['pandas', 'google.generativeai', 'flask', 'speech_recognition', 'pyaudio', 'dotenv'],
+    datas=[('puzzles.csv', '.'), ('puzzles.snapshot', '.'), ('.env', '.'), ('templates', 'templates')],
+    hiddenimports=['google.generativeai', 'flask', 'speech_recognition', 'pyaudio', 'dotenv'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['pandas'],
     noarchive=False,
     optimize=0,
 )
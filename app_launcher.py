@@ -15,7 +15,7 @@ def resource_path(relative_path):
 
 def start_web_server():
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    from web_app import app
+    from web_server import app
     app.run(debug=False, host='127.0.0.1', port=5001, use_reloader=False)
 
 def main():
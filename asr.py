@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Speech Recognition Backends
+Google or an offline Whisper model biased to the catalog's vocabulary, with failover
+"""
+
+import os
+import re
+import statistics
+import threading
+import time
+
+import speech_recognition as sr
+
+from audio_capture import trim_silence
+
+try:
+    import numpy
+    from faster_whisper import WhisperModel
+except ImportError:
+    # Offline recognition is optional; without it only the Google backend is available
+    WhisperModel = None
+
+# Tried in this order; a backend that errors (e.g. no network) hands over to the next.
+# 'Could not understand' is final, so offline misses don't all turn into cloud calls.
+ASR_BACKENDS = os.getenv('ASR_BACKENDS', 'local,google')
+# faster-whisper model name or path; base.en runs comfortably in real time on a laptop CPU
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base.en')
+WHISPER_COMPUTE_TYPE = os.getenv('WHISPER_COMPUTE_TYPE', 'int8')
+
+# Google gets 16 kHz audio: enough for speech, a third of a 48 kHz microphone's bytes
+UPLOAD_RATE = 16000
+# Silence kept around speech when trimming an upload
+TRIM_PAD = 0.25
+
+# Whisper reads only the last ~224 tokens of its prompt
+PROMPT_CHARS = 800
+
+PHRASE_SPLIT_RE = re.compile(r'[,()&→/]')
+NON_WORD_RE = re.compile(r"[^a-z0-9' ]+")
+
+
+def catalog_phrases(snapshot):
+    """Puzzle names (and their parenthesised parts), then rooms, then keywords
+
+    A catalog builder: register it with LiveCatalog.register and read
+    snapshot.get(catalog_phrases) so an edited puzzles.csv updates the bias.
+    """
+    phrases = {}
+    sources = [p.puzzle_name for p in snapshot.puzzles] + [p.room for p in snapshot.puzzles] \
+        + [p.keywords for p in snapshot.puzzles]
+    for source in sources:
+        for part in PHRASE_SPLIT_RE.split(source.lower()):
+            phrase = ' '.join(NON_WORD_RE.sub(' ', part).split())
+            if phrase:
+                phrases.setdefault(phrase, None)
+    return list(phrases)
+
+
+class _MeteredAudio(sr.AudioData):
+    """AudioData that remembers the size of the FLAC recognize_google encodes from it"""
+
+    flac_bytes = 0
+
+    def get_flac_data(self, *args, **kwargs):
+        data = super().get_flac_data(*args, **kwargs)
+        self.flac_bytes = len(data)
+        return data
+
+
+def prepare_upload(audio, energy_threshold):
+    """audio trimmed of surrounding silence and resampled to 16 kHz, 16-bit mono
+
+    recognize_google encodes it losslessly as FLAC before sending.
+    """
+    rate = min(audio.sample_rate, UPLOAD_RATE)
+    pcm = audio.get_raw_data(convert_rate=rate, convert_width=2)
+    return _MeteredAudio(trim_silence(pcm, rate, energy_threshold, TRIM_PAD), rate, 2)
+
+
+class GoogleASR:
+    """speech_recognition's free Google Web Speech API, sent trimmed 16 kHz FLAC"""
+
+    name = 'google'
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'bytes_sent': 0, 'bytes_captured': 0}
+        self.rtts = []
+
+    def transcribe(self, audio):
+        upload = prepare_upload(audio, self.recognizer.energy_threshold)
+        start = time.perf_counter()
+        try:
+            return self.recognizer.recognize_google(upload)
+        finally:
+            rtt = (time.perf_counter() - start) * 1000
+            self._record(audio, upload, rtt)
+
+    def _record(self, audio, upload, rtt):
+        captured = len(audio.frame_data)
+        print(f"Google ASR: sent {upload.flac_bytes / 1024:.1f} KB FLAC "
+              f"({captured / 1024:.0f} KB captured at {audio.sample_rate} Hz), {rtt:.0f} ms")
+        with self.lock:
+            self.counters['requests'] += 1
+            self.counters['bytes_sent'] += upload.flac_bytes
+            self.counters['bytes_captured'] += captured
+            self.rtts = (self.rtts + [rtt])[-100:]
+
+    def stats(self):
+        """Bytes sent versus captured, and round-trip times of the last 100 requests"""
+        with self.lock:
+            stats = dict(self.counters)
+            rtts = list(self.rtts)
+        stats['rtt_p50_ms'] = round(statistics.median(rtts)) if rtts else 0
+        stats['rtt_max_ms'] = round(max(rtts)) if rtts else 0
+        return stats
+
+
+class WhisperASR:
+    """faster-whisper on CPU, prompted with the catalog phrases so puzzle names come out right"""
+
+    name = 'local'
+
+    def __init__(self, phrases, model=WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE):
+        self.phrases = phrases
+        self.model = WhisperModel(model, device='cpu', compute_type=compute_type)
+
+    def prompt(self):
+        """Vocabulary hint for the decoder: as many of the current phrases as fit; None without phrases"""
+        phrases = self.phrases()
+        if not phrases:
+            return None
+        text = "Escape room puzzles:"
+        for phrase in phrases:
+            if len(text) + len(phrase) + 2 > PROMPT_CHARS:
+                break
+            text += f" {phrase},"
+        return text.rstrip(',') + '.'
+
+    def transcribe(self, audio):
+        pcm = audio.get_raw_data(convert_rate=16000, convert_width=2)
+        samples = numpy.frombuffer(pcm, numpy.int16).astype(numpy.float32) / 32768
+        segments, _ = self.model.transcribe(
+            samples, language='en', beam_size=1, vad_filter=False,
+            initial_prompt=self.prompt(), condition_on_previous_text=False,
+        )
+        text = ' '.join(segment.text.strip() for segment in segments).strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class SpeechToText:
+    """Tries each backend in order; raises sr.UnknownValueError/sr.RequestError like recognize_google"""
+
+    def __init__(self, backends):
+        self.backends = list(backends)
+
+    def transcribe(self, audio):
+        if not self.backends:
+            raise sr.RequestError("No speech recognition backend available")
+        for backend in self.backends:
+            try:
+                return backend.transcribe(audio)
+            except sr.UnknownValueError:
+                raise
+            except Exception as e:
+                error = e
+                print(f"Speech recognition ({backend.name}) failed: {e}")
+        raise sr.RequestError(str(error))
+
+
+def asr_backends_from_env(recognizer, phrases):
+    """The backends named in ASR_BACKENDS that can run here, in failover order
+
+    phrases is a callable returning the current catalog phrases.
+    """
+    backends = []
+    for name in ASR_BACKENDS.split(','):
+        name = name.strip()
+        if name == 'google':
+            backends.append(GoogleASR(recognizer))
+        elif name == 'local' and WhisperModel:
+            try:
+                # Downloads the model on first use, which fails when the network is down
+                backends.append(WhisperASR(phrases))
+            except Exception as e:
+                print(f"Could not load Whisper model {WHISPER_MODEL}: {e}; offline speech recognition disabled")
+        elif name == 'local':
+            print("faster-whisper not installed; offline speech recognition disabled")
+    return backends
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Audio Capture
+One long-lived microphone stream in a ring buffer, cut into utterances by a frame-level VAD
+"""
+
+import math
+import os
+import threading
+from array import array
+from collections import deque
+
+RING_SECONDS = float(os.getenv('CAPTURE_RING_SECONDS', '30'))
+# Audio kept from before the VAD triggered, so first syllables aren't clipped
+VAD_PREROLL = float(os.getenv('VAD_PREROLL', '0.5'))
+# Silence that ends an utterance, and the longest one allowed
+VAD_END_SILENCE = float(os.getenv('VAD_END_SILENCE', '0.8'))
+VAD_MAX_UTTERANCE = float(os.getenv('VAD_MAX_UTTERANCE', '15'))
+
+# Consecutive loud frames before an utterance starts (filters clicks and bangs)
+START_FRAMES = 2
+
+
+def rms(frame):
+    """Root mean square of 16-bit PCM, on the same scale as Recognizer.energy_threshold"""
+    samples = array('h', frame)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+def trim_silence(pcm, sample_rate, energy_threshold, pad=0.25, window=0.02):
+    """16-bit PCM without leading and trailing silence, keeping pad seconds around speech
+
+    Returned unchanged when no window is louder than energy_threshold.
+    """
+    step = max(1, int(sample_rate * window)) * 2
+    loud = [start for start in range(0, len(pcm), step) if rms(pcm[start:start + step]) > energy_threshold]
+    if not loud:
+        return pcm
+    margin = int(sample_rate * pad) * 2
+    return pcm[max(0, loud[0] - margin):min(len(pcm), loud[-1] + step + margin)]
+
+
+class AudioCapture:
+    """Reads a speech_recognition Microphone on a daemon thread into a ring buffer
+
+    Frames are numbered; a consumer that falls more than RING_SECONDS behind
+    skips to the oldest frame still held.
+    """
+
+    def __init__(self, microphone, ring_seconds=RING_SECONDS):
+        self.microphone = microphone
+        self.ring_seconds = ring_seconds
+        self.ring = deque()
+        self.next_seq = 0
+        self.dropped = 0
+        self.running = False
+        self.error = None
+        self.cond = threading.Condition()
+        self.ready = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Open the microphone once and keep reading until stop()"""
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='audio-capture', daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error:
+            raise self.error
+
+    def _run(self):
+        try:
+            with self.microphone as source:
+                self.sample_rate = source.SAMPLE_RATE
+                self.sample_width = source.SAMPLE_WIDTH
+                self.frame_seconds = source.CHUNK / source.SAMPLE_RATE
+                capacity = max(1, int(self.ring_seconds / self.frame_seconds))
+                self.ready.set()
+                while self.running:
+                    frame = source.stream.read(source.CHUNK)
+                    with self.cond:
+                        self.ring.append((self.next_seq, frame))
+                        self.next_seq += 1
+                        if len(self.ring) > capacity:
+                            self.ring.popleft()
+                        self.cond.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.running = False
+            self.ready.set()
+            with self.cond:
+                self.cond.notify_all()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    def frames(self):
+        """Every frame from now on, in order, until the capture stops"""
+        with self.cond:
+            seq = self.next_seq
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.next_seq > seq or not self.running)
+                if self.next_seq <= seq:
+                    if self.error:
+                        raise self.error
+                    return
+                oldest = self.ring[0][0]
+                if seq < oldest:
+                    self.dropped += oldest - seq
+                    seq = oldest
+                pending = [frame for n, frame in self.ring if n >= seq]
+            seq += len(pending)
+            yield from pending
+
+
+class UtteranceSegmenter:
+    """Energy VAD that turns a frame stream into utterances, pre-roll included
+
+    The threshold starts at the calibrated Recognizer.energy_threshold and
+    follows the noise floor the way speech_recognition's dynamic threshold does.
+    """
+
+    def __init__(self, frame_seconds, energy_threshold=300, preroll=VAD_PREROLL,
+                 end_silence=VAD_END_SILENCE, max_utterance=VAD_MAX_UTTERANCE):
+        self.energy_threshold = energy_threshold
+        # Same damping and ratio as Recognizer's dynamic_energy_threshold
+        self.damping = 0.15 ** frame_seconds
+        self.end_frames = max(1, round(end_silence / frame_seconds))
+        self.max_frames = max(1, round(max_utterance / frame_seconds))
+        self.preroll = deque(maxlen=max(1, round(preroll / frame_seconds)))
+        self.frames = None
+        self.loud = 0
+        self.quiet = 0
+
+    def _adapt(self, energy):
+        self.energy_threshold = self.energy_threshold * self.damping + energy * 1.5 * (1 - self.damping)
+
+    def feed(self, frame):
+        """Process one frame; a finished utterance's PCM bytes, or None"""
+        energy = rms(frame)
+        speech = energy > self.energy_threshold
+
+        if self.frames is None:
+            self.preroll.append(frame)
+            if not speech:
+                self._adapt(energy)
+                self.loud = 0
+                return None
+            self.loud += 1
+            if self.loud < START_FRAMES:
+                return None
+            self.frames = list(self.preroll)
+            self.preroll.clear()
+            self.quiet = 0
+            return None
+
+        self.frames.append(frame)
+        self.quiet = 0 if speech else self.quiet + 1
+        if self.quiet < self.end_frames and len(self.frames) < self.max_frames:
+            return None
+
+        utterance = b''.join(self.frames)
+        self.frames = None
+        self.loud = 0
+        return utterance
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Audio Store
+Byte-budgeted storage for synthesized speech, on disk or in memory
+"""
+
+import io
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# disk | memory (memory suits small deployments; nothing survives a restart)
+TTS_CACHE_BACKEND = os.getenv('TTS_CACHE_BACKEND', 'disk')
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', 'tts_cache')
+TTS_CACHE_BYTES = int(os.getenv('TTS_CACHE_BYTES', str(200 * 1024 * 1024)))
+# Drop audio not played for this many seconds (0 keeps it until the byte budget needs the room)
+TTS_CACHE_TTL = float(os.getenv('TTS_CACHE_TTL', str(30 * 24 * 3600)))
+TTS_CACHE_JANITOR_INTERVAL = float(os.getenv('TTS_CACHE_JANITOR_INTERVAL', '300'))
+
+# Formats the TTS backends produce, by file extension
+MIMETYPES = {'mp3': 'audio/mpeg', 'wav': 'audio/wav'}
+
+
+class AudioStore:
+    """LRU bookkeeping shared by the backends; subclasses only move bytes around"""
+
+    def __init__(self, max_bytes=TTS_CACHE_BYTES, ttl=TTS_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # audio_id -> [size, last_used, ext], least recently used first
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.counters = {'evicted': 0, 'expired': 0, 'bytes_evicted': 0}
+        self.janitor = None
+
+    def _add(self, audio_id, size, last_used, ext):
+        old = self.entries.pop(audio_id, None)
+        if old:
+            self.bytes -= old[0]
+        self.entries[audio_id] = [size, last_used, ext]
+        self.bytes += size
+
+    def _touch(self, audio_id):
+        """Mark audio_id as just used; its entry, or None if it isn't stored"""
+        with self.lock:
+            entry = self.entries.get(audio_id)
+            if entry is None:
+                return None
+            entry[1] = time.time()
+            self.entries.move_to_end(audio_id)
+            return list(entry)
+
+    def _victims(self, now):
+        """Pop expired entries, then least recently used ones until within budget"""
+        victims = []
+        while self.entries:
+            audio_id, (size, last_used, ext) = next(iter(self.entries.items()))
+            if self.ttl and now - last_used > self.ttl:
+                self.counters['expired'] += 1
+            elif self.bytes > self.max_bytes:
+                self.counters['evicted'] += 1
+            else:
+                break
+            del self.entries[audio_id]
+            self.bytes -= size
+            self.counters['bytes_evicted'] += size
+            victims.append((audio_id, ext))
+        return victims
+
+    def _remove(self, victims):
+        for audio_id, ext in victims:
+            self._delete(audio_id, ext)
+
+    def contains(self, audio_id):
+        with self.lock:
+            return audio_id in self.entries
+
+    def size(self, audio_id):
+        """Size of stored audio (marking it used), or None"""
+        entry = self._touch(audio_id)
+        return entry[0] if entry else None
+
+    def mimetype(self, audio_id):
+        """Content type of stored audio, or None"""
+        with self.lock:
+            entry = self.entries.get(audio_id)
+        return MIMETYPES[entry[2]] if entry else None
+
+    def put(self, audio_id, data, ext='mp3'):
+        """Store data, evicting older audio if the budget is exceeded"""
+        self._write(audio_id, data, ext)
+        with self.lock:
+            self._add(audio_id, len(data), time.time(), ext)
+            victims = self._victims(time.time())
+        self._remove(victims)
+
+    def sweep(self):
+        """Expire and evict now; the janitor calls this periodically"""
+        with self.lock:
+            victims = self._victims(time.time())
+        self._remove(victims)
+        return len(victims)
+
+    def start_janitor(self, interval=TTS_CACHE_JANITOR_INTERVAL):
+        """Sweep every interval seconds on a daemon thread (once per store)"""
+        if self.janitor or interval <= 0:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Audio store sweep failed: {e}")
+
+        self.janitor = threading.Thread(target=run, name='audio-janitor', daemon=True)
+        self.janitor.start()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['files'] = len(self.entries)
+            stats['bytes'] = self.bytes
+        stats['max_bytes'] = self.max_bytes
+        stats['backend'] = self.backend
+        return stats
+
+
+class DiskAudioStore(AudioStore):
+    """One file per id in a directory; last use is kept in the file's mtime across restarts"""
+
+    backend = 'disk'
+
+    def __init__(self, directory=TTS_CACHE_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        files = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith('.tmp'):
+                # Left behind by a crash mid-write
+                os.remove(path)
+            else:
+                audio_id, _, ext = name.partition('.')
+                if ext in MIMETYPES:
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, audio_id, stat.st_size, ext))
+        for mtime, audio_id, size, ext in sorted(files):
+            self._add(audio_id, size, mtime, ext)
+        self.sweep()
+
+    def _path(self, audio_id, ext):
+        return os.path.join(self.directory, f"{audio_id}.{ext}")
+
+    def _touch(self, audio_id):
+        entry = super()._touch(audio_id)
+        if entry:
+            try:
+                os.utime(self._path(audio_id, entry[2]))
+            except FileNotFoundError:
+                pass
+        return entry
+
+    def _write(self, audio_id, data, ext):
+        path = self._path(audio_id, ext)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _delete(self, audio_id, ext):
+        try:
+            os.remove(self._path(audio_id, ext))
+        except FileNotFoundError:
+            pass
+
+    def source(self, audio_id):
+        """Something send_file can serve (a path here), or None"""
+        entry = self._touch(audio_id)
+        return self._path(audio_id, entry[2]) if entry else None
+
+    def open(self, audio_id):
+        """Binary file object for stored audio, or None"""
+        entry = self._touch(audio_id)
+        if not entry:
+            return None
+        try:
+            return open(self._path(audio_id, entry[2]), 'rb')
+        except FileNotFoundError:
+            return None
+
+    def __str__(self):
+        return f"{self.directory}/"
+
+
+class MemoryAudioStore(AudioStore):
+    """Audio kept as bytes in this process"""
+
+    backend = 'memory'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.data = {}
+
+    def _write(self, audio_id, data, ext):
+        self.data[audio_id] = bytes(data)
+
+    def _delete(self, audio_id, ext):
+        self.data.pop(audio_id, None)
+
+    def open(self, audio_id):
+        """Binary file object for stored audio, or None"""
+        if not self._touch(audio_id):
+            return None
+        data = self.data.get(audio_id)
+        return io.BytesIO(data) if data is not None else None
+
+    # send_file takes a BytesIO as well, Range requests included
+    source = open
+
+    def __str__(self):
+        return 'memory'
+
+
+def audio_store_from_env():
+    """The store configured by TTS_CACHE_BACKEND, with its janitor running"""
+    store = MemoryAudioStore() if TTS_CACHE_BACKEND == 'memory' else DiskAudioStore()
+    store.start_janitor()
+    return store
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Speech Recognition Benchmark
+Word error rate and latency of each ASR backend on recorded queries
+
+The test set is a directory of WAV recordings, each with a .txt file next to it
+holding what was actually said (asr_samples/bells.wav + asr_samples/bells.txt).
+
+Usage: python bench_asr.py [samples_dir]
+"""
+
+import os
+import re
+import statistics
+import sys
+import time
+
+import speech_recognition as sr
+
+from asr import GoogleASR, WhisperASR, WhisperModel, catalog_phrases
+from catalog import get_catalog
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def words(text):
+    return WORD_RE.findall(text.lower())
+
+
+def edit_distance(reference, hypothesis):
+    """Word-level Levenshtein distance"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def load_samples(directory):
+    """(name, AudioData, reference words) for every WAV with a transcript"""
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        transcript = os.path.join(directory, stem + '.txt')
+        if ext != '.wav' or not os.path.exists(transcript):
+            continue
+        with sr.AudioFile(os.path.join(directory, name)) as source:
+            audio = sr.Recognizer().record(source)
+        with open(transcript, encoding='utf-8') as f:
+            samples.append((stem, audio, words(f.read())))
+    return samples
+
+
+def evaluate(backend, samples):
+    """Total word errors, reference words, per-query latencies (ms) and failures"""
+    errors = total = failures = 0
+    latencies = []
+    for name, audio, reference in samples:
+        start = time.perf_counter()
+        try:
+            hypothesis = words(backend.transcribe(audio))
+        except sr.UnknownValueError:
+            hypothesis = []
+        except Exception as e:
+            print(f"  {backend.name}: {name} failed: {e}")
+            failures += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        errors += edit_distance(reference, hypothesis)
+        total += len(reference)
+        if hypothesis != reference:
+            print(f"  {backend.name}: {name}: '{' '.join(hypothesis)}' (said '{' '.join(reference)}')")
+    return errors, total, latencies, failures
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'asr_samples'
+    samples = load_samples(directory) if os.path.isdir(directory) else []
+    if not samples:
+        raise SystemExit(f"No .wav + .txt pairs in {directory}/")
+
+    catalog = get_catalog('puzzles.csv')
+    catalog.register(catalog_phrases)
+    phrases = lambda: catalog.current.get(catalog_phrases)
+
+    backends = [GoogleASR(sr.Recognizer())]
+    if WhisperModel:
+        # No phrases means no initial prompt at all: the baseline showing what the catalog prompt buys
+        unbiased = WhisperASR(lambda: [])
+        unbiased.name = 'local (no bias)'
+        backends += [unbiased, WhisperASR(phrases)]
+    else:
+        print("faster-whisper not installed; comparing Google only")
+
+    print(f"{len(samples)} recordings, "
+          f"{sum(len(audio.frame_data) / audio.sample_rate / audio.sample_width for _, audio, _ in samples):.0f}s of audio\n")
+    results = [(backend.name, evaluate(backend, samples)) for backend in backends]
+
+    print(f"\n{'Backend':<18}{'WER':>8}{'p50 ms':>10}{'p95 ms':>10}{'Failed':>8}")
+    for name, (errors, total, latencies, failures) in results:
+        wer = errors / total if total else 0.0
+        p50 = statistics.median(latencies) if latencies else 0.0
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else p50
+        print(f"{name:<18}{wer:>8.1%}{p50:>10.0f}{p95:>10.0f}{failures:>8}")
+
+    google = backends[0].stats()
+    if google['requests']:
+        print(f"\nGoogle uploads: {google['bytes_sent'] / google['requests'] / 1024:.1f} KB per query "
+              f"({google['bytes_sent'] / max(1, google['bytes_captured']):.0%} of the captured PCM)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Startup Benchmark
+Compares cold start of the entry points with the old pandas catalog load
+against the csv-based catalog
+
+Usage: python bench_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+# What each entry point imports and loads before it can answer a query.
+# app_launcher.py starts the server by importing web_server, which loads every persona.
+ENTRY_POINTS = {
+    'escape_ai.py': "import escape_ai; escape_ai.get_catalog('puzzles.csv')",
+    'app_launcher.py': "import app_launcher, web_server",
+    'catalog only': "from catalog import LiveCatalog; LiveCatalog('puzzles.csv')",
+}
+
+# The old startup: every entry point imported pandas and called read_csv
+PANDAS_LOAD = "import pandas; pandas.read_csv('puzzles.csv'); "
+
+CHECK_NO_PANDAS = "; import sys; assert 'pandas' not in sys.modules, 'pandas was imported'"
+
+
+def time_startup(code, runs):
+    """Median wall time in ms of a fresh interpreter running code, plus any error"""
+    env = dict(os.environ, GOOGLE_API_KEY=os.getenv('GOOGLE_API_KEY', 'benchmark'))
+    timer = "import time; _t = time.perf_counter(); {code}; print((time.perf_counter() - _t) * 1000)"
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', timer.format(code=code)],
+            capture_output=True, text=True, env=env
+        )
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()
+            return None, error[-1] if error else 'unknown error'
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples), None
+
+
+def format_ms(value):
+    return f"{value:.0f} ms" if value is not None else 'n/a'
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"Startup time, median of {runs} cold runs\n")
+    print(f"{'entry point':<18}{'pandas (old)':>14}{'csv (new)':>12}{'saved':>10}")
+
+    errors = []
+    for name, code in ENTRY_POINTS.items():
+        before, before_error = time_startup(PANDAS_LOAD + code, runs)
+        after, after_error = time_startup(code + CHECK_NO_PANDAS, runs)
+        saved = before - after if before is not None and after is not None else None
+        print(f"{name:<18}{format_ms(before):>14}{format_ms(after):>12}{format_ms(saved):>10}")
+        errors.extend(f"{name} ({label}): {error}" for label, error in
+                      (('pandas', before_error), ('csv', after_error)) if error)
+
+    if errors:
+        print("\nSome runs could not complete:")
+        for error in errors:
+            print(f"  {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Wake Word Benchmark
+False accept/reject rates and CPU cost of the offline wake word spotter
+
+Recordings are 16 kHz, 16-bit mono WAV files laid out as
+  samples/<phrase with underscores>/*.wav   each containing that phrase once
+  samples/negative/*.wav                     room noise and chatter without any
+(convert others with e.g. `ffmpeg -i in.m4a -ar 16000 -ac 1 out.wav`)
+
+Usage: python bench_wake_word.py [samples_dir]
+"""
+
+import os
+import sys
+import time
+import wave
+
+from escape_ai_service import EscapeRoomAIService
+from wake_word import CHUNK, SAMPLE_RATE, SAMPLE_WIDTH, WakeWordSpotter
+
+PHRASES = EscapeRoomAIService.wake_words + EscapeRoomAIService.shutdown_phrases
+
+
+def read_wav(path):
+    """PCM bytes of a WAV file in the spotter's format"""
+    with wave.open(path, 'rb') as f:
+        if (f.getframerate(), f.getsampwidth(), f.getnchannels()) != (SAMPLE_RATE, SAMPLE_WIDTH, 1):
+            raise SystemExit(f"{path}: expected {SAMPLE_RATE} Hz 16-bit mono")
+        return f.readframes(f.getnframes())
+
+
+def spot(spotter, pcm):
+    """Phrases detected in pcm fed chunk by chunk, as the service reads the microphone"""
+    spotter.reset()
+    heard = []
+    step = CHUNK * SAMPLE_WIDTH
+    for start in range(0, len(pcm), step):
+        phrase = spotter.feed(pcm[start:start + step])
+        if phrase:
+            heard.append(phrase)
+    return heard
+
+
+def main():
+    samples = sys.argv[1] if len(sys.argv) > 1 else 'samples'
+    if not os.path.isdir(samples):
+        raise SystemExit(f"No recordings in {samples}/ (see the layout in this file's header)")
+
+    spotter = WakeWordSpotter(PHRASES)
+    rows = []
+    negative_seconds = 0.0
+    false_accepts = 0
+    audio_seconds = 0.0
+    cpu_seconds = 0.0
+
+    for label in sorted(os.listdir(samples)):
+        directory = os.path.join(samples, label)
+        files = sorted(name for name in os.listdir(directory) if name.endswith('.wav'))
+        expected = label.replace('_', ' ')
+        detected = 0
+        for name in files:
+            pcm = read_wav(os.path.join(directory, name))
+            start = time.process_time()
+            heard = spot(spotter, pcm)
+            cpu_seconds += time.process_time() - start
+            seconds = len(pcm) / (SAMPLE_RATE * SAMPLE_WIDTH)
+            audio_seconds += seconds
+
+            if label == 'negative':
+                negative_seconds += seconds
+                false_accepts += len(heard)
+                for phrase in heard:
+                    print(f"  false accept: '{phrase}' in negative/{name}")
+            elif expected in heard:
+                detected += 1
+            else:
+                print(f"  false reject: {label}/{name} (heard {heard or 'nothing'})")
+        if label != 'negative' and files:
+            rows.append((expected, len(files), detected))
+
+    print(f"\n{'Phrase':<22}{'Clips':>7}{'Detected':>10}{'False reject':>14}")
+    for phrase, clips, detected in rows:
+        print(f"{phrase:<22}{clips:>7}{detected:>10}{(clips - detected) / clips:>14.1%}")
+    if rows:
+        clips = sum(row[1] for row in rows)
+        print(f"{'all phrases':<22}{clips:>7}{sum(row[2] for row in rows):>10}"
+              f"{1 - sum(row[2] for row in rows) / clips:>14.1%}")
+
+    if negative_seconds:
+        print(f"\nFalse accepts: {false_accepts} in {negative_seconds / 60:.1f} min of negative audio "
+              f"= {false_accepts / (negative_seconds / 3600):.2f} per hour")
+    if audio_seconds:
+        print(f"CPU: {cpu_seconds:.2f}s for {audio_seconds / 60:.1f} min of audio "
+              f"= {cpu_seconds / audio_seconds * 3600:.0f} CPU-seconds per hour "
+              f"({cpu_seconds / audio_seconds:.1%} of one core)")
+
+
+if __name__ == "__main__":
+    main()
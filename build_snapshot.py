@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Catalog Snapshot Builder
+Compiles puzzles.csv into puzzles.snapshot for the packaged desktop app
+
+Usage: python build_snapshot.py [puzzles.csv] [puzzles.snapshot]
+"""
+
+import hashlib
+import os
+import sys
+import time
+
+from catalog import CatalogSnapshot, parse_csv, read_snapshot, snapshot_path_for, write_snapshot
+
+
+def build(csv_path, snapshot_path):
+    with open(csv_path, 'rb') as f:
+        data = f.read()
+
+    snapshot = CatalogSnapshot(parse_csv(data), hashlib.sha1(data).hexdigest())
+    write_snapshot(snapshot, snapshot_path)
+
+    # Make sure the app will accept what we just wrote
+    start = time.perf_counter()
+    loaded = read_snapshot(snapshot_path, snapshot.fingerprint)
+    elapsed = (time.perf_counter() - start) * 1000
+    if loaded is None or len(loaded.puzzles) != len(snapshot.puzzles):
+        raise SystemExit(f"Snapshot verification failed for {snapshot_path}")
+
+    size = os.path.getsize(snapshot_path)
+    print(f"Wrote {snapshot_path}: {len(snapshot.puzzles)} puzzles, {size} bytes, "
+          f"loads in {elapsed:.2f} ms (CSV sha1 {snapshot.fingerprint[:12]})")
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'puzzles.csv'
+    snapshot_path = sys.argv[2] if len(sys.argv) > 2 else snapshot_path_for(csv_path)
+    build(csv_path, snapshot_path)
@@ -4,12 +4,16 @@ echo Building Windows application...
 call venv\Scripts\activate
 pip install pyinstaller
 
+REM Precompile the catalog so the app starts without parsing puzzles.csv
+python build_snapshot.py puzzles.csv puzzles.snapshot
+
 pyinstaller --onefile --windowed ^
     --name "EscapeRoom Assistant" ^
     --add-data "puzzles.csv;." ^
+    --add-data "puzzles.snapshot;." ^
     --add-data ".env;." ^
     --add-data "templates;templates" ^
-    --hidden-import=pandas ^
+    --exclude-module=pandas ^
     --hidden-import=google.generativeai ^
     --hidden-import=flask ^
     --hidden-import=speech_recognition ^
@@ -9,15 +9,19 @@ def build_windows():
     # Install PyInstaller if not already installed
     subprocess.run([sys.executable, "-m", "pip", "install", "pyinstaller"], check=True)
     
+    # Precompile the catalog so the app starts without parsing puzzles.csv
+    subprocess.run([sys.executable, "build_snapshot.py", "puzzles.csv", "puzzles.snapshot"], check=True)
+    
     # Build command for Windows
     cmd = [
         sys.executable, "-m", "PyInstaller",
         "--onefile",
         "--name", "EscapeRoom Assistant",
         "--add-data", "puzzles.csv;.",
+        "--add-data", "puzzles.snapshot;.",
         "--add-data", ".env;.",
         "--add-data", "templates;templates",
-        "--hidden-import=pandas",
+        "--exclude-module=pandas",
         "--hidden-import=google.generativeai",
         "--hidden-import=flask",
         "--hidden-import=speech_recognition",
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Puzzle Catalog
+Immutable catalog snapshots that are hot-reloaded when puzzles.csv changes
+"""
+
+import csv
+import hashlib
+import io
+import os
+import pickle
+import signal
+import struct
+import sys
+import threading
+import time
+from types import MappingProxyType
+
+from fuzzy_index import FuzzyIndex
+from prompts import render_fragments
+from puzzle_index import PuzzleIndex
+
+REQUIRED_COLUMNS = ['id', 'room', 'puzzle_name', 'hint1', 'hint2', 'hint3', 'hint4']
+
+# Seconds between mtime checks of puzzles.csv
+POLL_INTERVAL = float(os.getenv('CATALOG_POLL_INTERVAL', '2'))
+
+# Precompiled snapshot layout: magic, format version, SHA-1 of the source CSV, pickle payload.
+# Bump SNAPSHOT_VERSION whenever Puzzle, the indexes or the fragments change shape.
+SNAPSHOT_MAGIC = b'ERSNAP\x00\x00'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER = struct.Struct('<8sH40s')
+
+
+class CatalogError(ValueError):
+    """Raised when a puzzles.csv version fails validation"""
+
+
+def clean_text(value):
+    """Strip a CSV cell; missing values (None/NaN) become ''"""
+    return value.strip() if isinstance(value, str) else ''
+
+
+def clean_int(value):
+    """Parse an integer cell, or None when it is missing or malformed"""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class Puzzle:
+    """One puzzle with its hints already cleaned into a tuple"""
+
+    __slots__ = ('id', 'room', 'puzzle_name', 'physical_description', 'keywords', 'hints',
+                 'video_url', 'difficulty', 'estimated_time_min', 'dependencies')
+
+    def __init__(self, id, room, puzzle_name, physical_description='', keywords='', hints=(),
+                 video_url='', difficulty=None, estimated_time_min=None, dependencies=''):
+        self.id = id
+        self.room = room
+        self.puzzle_name = puzzle_name
+        self.physical_description = physical_description
+        self.keywords = keywords
+        self.hints = hints
+        self.video_url = video_url
+        self.difficulty = difficulty
+        self.estimated_time_min = estimated_time_min
+        self.dependencies = dependencies
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a puzzle from a CSV row mapping"""
+        hints = tuple(h for h in (clean_text(row.get(f'hint{i}')) for i in range(1, 5)) if h)
+        return cls(
+            id=clean_text(row.get('id')),
+            # Rooms repeat across puzzles; share one string per room
+            room=sys.intern(clean_text(row.get('room'))),
+            puzzle_name=clean_text(row.get('puzzle_name')),
+            physical_description=clean_text(row.get('physical_description')),
+            keywords=clean_text(row.get('keywords')),
+            hints=hints,
+            video_url=clean_text(row.get('video_url')),
+            difficulty=clean_int(row.get('difficulty')),
+            estimated_time_min=clean_int(row.get('estimated_time_min')),
+            dependencies=clean_text(row.get('dependencies')),
+        )
+
+    @property
+    def key(self):
+        """Session key used by the chat apps, e.g. 'Room 2_Distaff Wheel Alignment'"""
+        return f"{self.room}_{self.puzzle_name}"
+
+    def __repr__(self):
+        return f"Puzzle({self.id!r}, {self.room!r}, {self.puzzle_name!r})"
+
+
+class PuzzleCatalog:
+    """Puzzles in CSV order with O(1) lookups by id, (room, puzzle_name), session key and room"""
+
+    def __init__(self, puzzles):
+        self.puzzles = tuple(puzzles)
+        if not self.puzzles:
+            raise CatalogError("no puzzles found")
+
+        self.by_id = {}
+        self.by_key = {}
+        self.by_session_key = {}
+        by_room = {}
+        for puzzle in self.puzzles:
+            if not puzzle.room or not puzzle.puzzle_name:
+                raise CatalogError(f"puzzle {puzzle.id!r} needs a room and puzzle_name")
+            if puzzle.id in self.by_id:
+                raise CatalogError(f"duplicate puzzle id {puzzle.id!r}")
+            if (puzzle.room, puzzle.puzzle_name) in self.by_key:
+                raise CatalogError(f"duplicate puzzle {puzzle.puzzle_name!r} in {puzzle.room}")
+            self.by_id[puzzle.id] = puzzle
+            self.by_key[(puzzle.room, puzzle.puzzle_name)] = puzzle
+            self.by_session_key[puzzle.key] = puzzle
+            by_room.setdefault(puzzle.room, []).append(puzzle)
+        self.by_room = {room: tuple(puzzles) for room, puzzles in by_room.items()}
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls(Puzzle.from_row(row) for row in rows)
+
+    def get(self, room, puzzle_name):
+        """The puzzle with this room and name, or None"""
+        return self.by_key.get((room, puzzle_name))
+
+    def get_by_session_key(self, key):
+        """The puzzle with this Puzzle.key ('Room 2_Distaff Wheel Alignment'), or None"""
+        return self.by_session_key.get(key)
+
+    def get_by_id(self, puzzle_id):
+        return self.by_id.get(puzzle_id)
+
+    def in_room(self, room):
+        return self.by_room.get(room, ())
+
+    @property
+    def rooms(self):
+        return tuple(self.by_room)
+
+    def __iter__(self):
+        return iter(self.puzzles)
+
+    def __len__(self):
+        return len(self.puzzles)
+
+
+def parse_csv(data):
+    """Parse puzzles.csv bytes with the csv module (no pandas on the runtime path)"""
+    reader = csv.DictReader(io.StringIO(data.decode('utf-8-sig'), newline=''))
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise CatalogError(f"missing columns: {', '.join(missing)}")
+    return PuzzleCatalog.from_rows(reader)
+
+
+class CatalogSnapshot:
+    """One validated version of the catalog plus everything derived from it
+
+    A snapshot is fully built before it is published, so readers can grab
+    catalog.current once and use it for the whole request without locking.
+    """
+
+    def __init__(self, puzzles, fingerprint, builders=(), index=None, fuzzy_index=None, fragments=None):
+        self.puzzles = puzzles
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+        self.index = index or PuzzleIndex(puzzles)
+        self.fuzzy_index = fuzzy_index or FuzzyIndex(puzzles)
+        self.fragments = MappingProxyType(fragments or render_fragments(puzzles))
+        self.derived = MappingProxyType({builder: builder(self) for builder in builders})
+
+    def get(self, builder):
+        """Return the value a registered builder produced for this snapshot"""
+        return self.derived[builder]
+
+
+def write_snapshot(snapshot, path):
+    """Write puzzles, indexes and prompt fragments to a precompiled snapshot file"""
+    payload = pickle.dumps(
+        (snapshot.puzzles, snapshot.index, snapshot.fuzzy_index, dict(snapshot.fragments)),
+        protocol=pickle.HIGHEST_PROTOCOL
+    )
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, snapshot.fingerprint.encode('ascii'))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header + payload)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path, fingerprint=None, builders=()):
+    """Load a precompiled snapshot with one read, or None if missing, corrupt or stale
+
+    When fingerprint is given the snapshot is only used if it was built from
+    a CSV with that SHA-1, so an edited puzzles.csv always wins.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, source = SNAPSHOT_HEADER.unpack_from(data)
+    except (OSError, struct.error):
+        return None
+
+    source = source.decode('ascii', 'replace')
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        print(f"Ignoring {path}: unsupported snapshot format")
+        return None
+    if fingerprint and source != fingerprint:
+        print(f"Ignoring {path}: built from a different puzzles.csv")
+        return None
+
+    try:
+        puzzles, index, fuzzy_index, fragments = pickle.loads(memoryview(data)[SNAPSHOT_HEADER.size:])
+    except Exception as e:
+        print(f"Ignoring {path}: {e}")
+        return None
+    return CatalogSnapshot(puzzles, source, builders, index=index,
+                           fuzzy_index=fuzzy_index, fragments=fragments)
+
+
+def snapshot_path_for(csv_path):
+    """puzzles.csv -> puzzles.snapshot"""
+    return os.path.splitext(csv_path)[0] + '.snapshot'
+
+
+class LiveCatalog:
+    """Holds the current CatalogSnapshot and swaps in new versions atomically"""
+
+    def __init__(self, path='puzzles.csv', poll_interval=POLL_INTERVAL, snapshot_path=None):
+        self.path = path
+        self.snapshot_path = snapshot_path or os.getenv('CATALOG_SNAPSHOT') or snapshot_path_for(path)
+        self.poll_interval = poll_interval
+        self.builders = []
+        self.listeners = []
+        self.reload_lock = threading.Lock()
+        self.watcher = None
+        self.file_stat = self._stat()
+        self.snapshot = self._build()
+
+    @property
+    def current(self):
+        """The latest published snapshot; a plain attribute read, never blocks"""
+        return self.snapshot
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def _build(self):
+        """Load the precompiled snapshot if it matches the CSV, else parse the CSV"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            # A bundle may ship only the snapshot; use it unverified
+            snapshot = read_snapshot(self.snapshot_path, builders=self.builders)
+            if snapshot:
+                return snapshot
+            raise FileNotFoundError(f"{self.path} not found. Please ensure the file exists.")
+
+        fingerprint = hashlib.sha1(data).hexdigest()
+        if os.path.exists(self.snapshot_path):
+            snapshot = read_snapshot(self.snapshot_path, fingerprint, self.builders)
+            if snapshot:
+                return snapshot
+        return CatalogSnapshot(parse_csv(data), fingerprint, self.builders)
+
+    def register(self, builder):
+        """Derive something (a prompt, an index) from every snapshot
+
+        The builder is called with the snapshot and its result is available
+        via snapshot.get(builder). It runs now for the current snapshot and
+        again for each reloaded one before it is published.
+        """
+        with self.reload_lock:
+            if builder in self.builders:
+                return
+            self.builders.append(builder)
+            snapshot = self.snapshot
+            snapshot.derived = MappingProxyType({**snapshot.derived, builder: builder(snapshot)})
+
+    def on_reload(self, callback):
+        """Call callback(snapshot) after each successful reload"""
+        self.listeners.append(callback)
+
+    def reload(self):
+        """Load the file again; keep serving the old snapshot if it is invalid"""
+        with self.reload_lock:
+            self.file_stat = self._stat()
+            try:
+                snapshot = self._build()
+            except Exception as e:
+                print(f"Catalog reload failed, keeping previous version: {e}")
+                return False
+
+            if snapshot.fingerprint == self.snapshot.fingerprint:
+                return False
+            self.snapshot = snapshot
+
+        print(f"Reloaded {len(snapshot.puzzles)} puzzles from {self.path}")
+        for callback in self.listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Catalog reload listener failed: {e}")
+        return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            if self._stat() != self.file_stat:
+                self.reload()
+
+    def start_watching(self):
+        """Poll the file's mtime in a daemon thread"""
+        if self.watcher is None:
+            self.watcher = threading.Thread(target=self._watch, name='catalog-watcher', daemon=True)
+            self.watcher.start()
+
+    def install_reload_signal(self):
+        """Reload on SIGHUP (POSIX only, must be called from the main thread)"""
+        if not hasattr(signal, 'SIGHUP') or threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signal.SIGHUP, lambda *_: threading.Thread(target=self.reload, daemon=True).start())
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(path='puzzles.csv'):
+    """Process-wide LiveCatalog for a path, watching for edits"""
+    with _catalogs_lock:
+        catalog = _catalogs.get(path)
+        if catalog is None:
+            catalog = LiveCatalog(path)
+            catalog.start_watching()
+            catalog.install_reload_signal()
+            _catalogs[path] = catalog
+        return catalog
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Chat Turns
+The chat turn shared by the hint-giving personas: catalog answers first, Gemini for the rest
+"""
+
+from flask import Response, jsonify, request
+
+from catalog import get_catalog
+from intent_router import NEW_PUZZLE, NEXT_HINT, REPEAT, SMALL_TALK
+from prompts import CompiledPrompt, candidate_puzzles, estimate_tokens, render_catalog_json, render_puzzle_names
+from services import get_intent_router, get_llm, get_single_flight, persona_session
+from sse import sse_event, sse_response
+
+# Candidate renderings by the name of the full-catalog fragment they stand in for
+CANDIDATE_RENDERERS = {'catalog_json': render_catalog_json, 'puzzle_names': render_puzzle_names}
+
+# Served at <persona>/chat_stream.js for the pages that stream replies
+STREAM_CHAT_JS = """
+function streamChat(message, handlers) {
+    // POST to the SSE endpoint and dispatch each 'event: ...' frame to its handler
+    return fetch('api/chat/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message: message })
+    })
+    .then(response => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        function read() {
+            return reader.read().then(({ done, value }) => {
+                if (done) return;
+                buffer += decoder.decode(value, { stream: true });
+                const frames = buffer.split('\\n\\n');
+                buffer = frames.pop();
+                frames.forEach(frame => {
+                    const event = (frame.match(/^event: (.*)$/m) || [])[1];
+                    const data = (frame.match(/^data: (.*)$/m) || [])[1];
+                    if (handlers[event] && data) handlers[event](JSON.parse(data));
+                });
+                return read();
+            });
+        }
+        return read();
+    });
+}
+"""
+
+
+def render_chat_prompt(snapshot, builder, message, current_key, fragment='catalog_json', field='catalog', **fields):
+    """Render a chat prompt with only the puzzles this message is likely about
+
+    The candidates are rendered like snapshot.fragments[fragment] and filled
+    into the template's $field; the log line shows the tokens that saves.
+    """
+    candidates = candidate_puzzles(snapshot, message, current_key)
+    rendered = CANDIDATE_RENDERERS[fragment](candidates)
+    prompt = snapshot.get(builder).render(message=message, **{field: rendered}, **fields)
+
+    pruned = estimate_tokens(snapshot.fragments[fragment]) - estimate_tokens(rendered)
+    print(f"Chat prompt: ~{estimate_tokens(prompt)} tokens with {len(candidates)} puzzles "
+          f"(~{estimate_tokens(prompt) + pruned} with the full catalog)")
+    return prompt
+
+
+class ChatTurns:
+    """One persona's hint chat over the shared router, LLM client and catalog
+
+    template is the persona's Gemini prompt ($catalog, $current_puzzle,
+    $hint_count, $history, $message). A hint reads hint_format (with
+    {puzzle} and {hint}) followed by more_hints, or last_hint once the
+    puzzle has none left.
+    """
+
+    def __init__(self, name, template, hint_format, more_hints, last_hint, small_talk_reply, error_reply,
+                 catalog_path='puzzles.csv'):
+        self.name = name
+        self.template = template
+        self.hint_format = hint_format
+        self.more_hints = more_hints
+        self.last_hint = last_hint
+        self.small_talk_reply = small_talk_reply
+        self.error_reply = error_reply
+        self.llm = get_llm()
+        self.chat_flight = get_single_flight('chat')
+        self.router = get_intent_router()
+        self.catalog = get_catalog(catalog_path)
+        self.catalog.register(self.build_prompt)
+
+    def build_prompt(self, snapshot):
+        return CompiledPrompt(self.template)
+
+    def begin_turn(self, state):
+        """Set up this persona's session state"""
+        if 'conversation' not in state:
+            state['conversation'] = []
+        if 'current_puzzle' not in state:
+            state['current_puzzle'] = None
+        if 'hint_count' not in state:
+            state['hint_count'] = 0
+
+    def chat_prompt(self, state, message, snapshot):
+        """The Gemini prompt for a message the router couldn't answer"""
+        history = "\\n".join([f"User: {c['user']}\\nYou: {c['assistant']}" for c in state['conversation'][-5:]])
+        return render_chat_prompt(
+            snapshot, self.build_prompt, message, state.get('current_puzzle'),
+            current_puzzle=state.get('current_puzzle'),
+            hint_count=state.get('hint_count', 0),
+            history=history
+        )
+
+    def hint_text(self, puzzle, index, repeat=False):
+        """The reply giving hint number index (0-based) of a puzzle"""
+        response_text = self.hint_format.format(puzzle=puzzle.puzzle_name, hint=puzzle.hints[index])
+        if repeat:
+            return response_text
+        return response_text + (self.more_hints if index + 1 < len(puzzle.hints) else self.last_hint)
+
+    def canned_replies(self, snapshot):
+        """Every reply this persona gives without Gemini, for TTS pre-synthesis"""
+        yield self.small_talk_reply
+        for puzzle in snapshot.puzzles:
+            for index in range(len(puzzle.hints)):
+                yield self.hint_text(puzzle, index)
+                yield self.hint_text(puzzle, index, repeat=True)
+
+    def local_reply(self, state, message, snapshot):
+        """(intent, reply) from the catalog; a None reply means ask Gemini"""
+        intent = self.router.classify(message, snapshot, state.get('current_puzzle'))
+        puzzle = intent.puzzle
+
+        if puzzle and state.get('current_puzzle') != puzzle.key:
+            state['current_puzzle'] = puzzle.key
+            state['hint_count'] = 0
+
+        response_text = None
+        if intent.kind == SMALL_TALK:
+            response_text = self.small_talk_reply
+        elif intent.kind == REPEAT and state['hint_count'] > 0:
+            response_text = self.hint_text(puzzle, state['hint_count'] - 1, repeat=True)
+        elif intent.kind in (NEXT_HINT, NEW_PUZZLE) and state['hint_count'] < len(puzzle.hints):
+            response_text = self.hint_text(puzzle, state['hint_count'])
+            state['hint_count'] += 1
+
+        self.router.record(intent, response_text is not None)
+        return intent, response_text
+
+    def end_turn(self, state, message, response_text):
+        """Record the exchange in the conversation history"""
+        conversation = state['conversation']
+        conversation.append({'user': message, 'assistant': response_text})
+        state['conversation'] = conversation[-10:]
+
+    def chat(self, extra=None):
+        """POST /api/chat: the whole reply as JSON"""
+        message = request.json.get('message', '')
+        snapshot = self.catalog.current
+        state = persona_session(self.name)
+        self.begin_turn(state)
+
+        try:
+            # Hints, repeats and small talk are answered locally; Gemini only sees the rest
+            intent, response_text = self.local_reply(state, message, snapshot)
+            if response_text is None:
+                prompt = self.chat_prompt(state, message, snapshot)
+                response_text = self.chat_flight.do(prompt, lambda: self.llm.generate_sync(prompt)).strip()
+            self.end_turn(state, message, response_text)
+
+            return jsonify({'response': response_text, **(extra(response_text) if extra else {})})
+
+        except Exception as e:
+            print(f"Chat error ({self.name}): {e}")
+            return jsonify({'response': self.error_reply})
+
+    def chat_stream(self, extra=None):
+        """/api/chat as server-sent events: 'token' events as text arrives, then 'done'"""
+        message = request.json.get('message', '')
+        snapshot = self.catalog.current
+        state = persona_session(self.name)
+        self.begin_turn(state)
+
+        def events():
+            parts = []
+            intent = local_text = None
+            try:
+                intent, local_text = self.local_reply(state, message, snapshot)
+                if local_text is not None:
+                    chunks = [local_text]
+                else:
+                    prompt = self.chat_prompt(state, message, snapshot)
+                    # Pages sending the same prompt at once share one Gemini stream
+                    chunks = self.chat_flight.stream(prompt, lambda: self.llm.stream_sync(prompt))
+                for chunk in chunks:
+                    parts.append(chunk)
+                    yield sse_event('token', chunk)
+                response_text = ''.join(parts).strip()
+                self.end_turn(state, message, response_text)
+            except Exception as e:
+                print(f"Chat stream error ({self.name}): {e}")
+                response_text = self.error_reply
+
+            yield sse_event('done', {
+                'response': response_text,
+                'intent': intent.kind if intent else None,
+                'local': local_text is not None,
+                'current_puzzle': state['current_puzzle'],
+                'hint_count': state['hint_count'],
+                **(extra(response_text) if extra else {})
+            })
+
+        return sse_response(events())
+
+    def clear(self):
+        state = persona_session(self.name)
+        state.clear()
+        return jsonify({'status': 'cleared'})
+
+    def add_routes(self, bp, extra=None):
+        """Mount /api/chat, /api/chat/stream, /api/clear and chat_stream.js on a persona's blueprint
+
+        extra(response_text), if given, returns more fields for the reply (e.g. its audio).
+        """
+        bp.add_url_rule('/api/chat', 'chat', lambda: self.chat(extra), methods=['POST'])
+        bp.add_url_rule('/api/chat/stream', 'chat_stream', lambda: self.chat_stream(extra), methods=['POST'])
+        bp.add_url_rule('/api/clear', 'clear', self.clear, methods=['POST'])
+        bp.add_url_rule('/chat_stream.js', 'chat_stream_js',
+                        lambda: Response(STREAM_CHAT_JS, mimetype='application/javascript'))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Context Cache
+Uploads the static catalog prefix of a prompt once as a Gemini cached context
+"""
+
+import datetime
+import hashlib
+import os
+import threading
+import time
+
+import google.generativeai as genai
+# Context caching (CachedContent, GenerativeModel.from_cached_content) needs google-generativeai 0.7+
+from google.generativeai import caching
+
+from singleflight import SingleFlight
+
+# off | gemini | local (local prepends the prefix itself; for development without the API)
+CONTEXT_CACHE_MODE = os.getenv('CONTEXT_CACHE', 'off')
+# Context caching needs a versioned model name
+CONTEXT_CACHE_MODEL = os.getenv('CONTEXT_CACHE_MODEL', 'models/gemini-1.5-flash-002')
+CONTEXT_CACHE_TTL = float(os.getenv('CONTEXT_CACHE_TTL', '3600'))
+
+# Recreate a cache this long before it expires so requests never hit a dead one
+REFRESH_MARGIN = 60
+
+
+class LocalCachedModel:
+    """Stand-in for a model bound to a cached context: sends prefix + prompt"""
+
+    def __init__(self, model, prefix):
+        self.model = model
+        self.prefix = prefix
+
+    async def generate_content_async(self, prompt, **kwargs):
+        return await self.model.generate_content_async(self.prefix + prompt, **kwargs)
+
+
+class ContextCache:
+    """One cached context per static prefix, keyed by its hash
+
+    The prefix contains the rendered catalog, so an edited puzzles.csv
+    produces a new key and a new cache; old ones are dropped locally and
+    left to expire on Gemini's side.
+    """
+
+    def __init__(self, model, mode=CONTEXT_CACHE_MODE, model_name=CONTEXT_CACHE_MODEL, ttl=CONTEXT_CACHE_TTL):
+        self.model = model
+        self.mode = mode
+        self.model_name = model_name
+        self.ttl = ttl
+        self.entries = {}
+        self.unavailable = set()
+        self.lock = threading.Lock()
+        self.flight = SingleFlight()
+        self.counters = {'hits': 0, 'created': 0, 'failures': 0}
+
+    def _create(self, prefix, key):
+        if self.mode == 'local':
+            return LocalCachedModel(self.model, prefix)
+        cached = caching.CachedContent.create(
+            model=self.model_name,
+            display_name=f"escaperoom-{key[:12]}",
+            contents=[prefix],
+            ttl=datetime.timedelta(seconds=self.ttl),
+        )
+        return genai.GenerativeModel.from_cached_content(cached_content=cached)
+
+    def model_for(self, prefix):
+        """A model with prefix already in context, or None to send it inline"""
+        key = hashlib.sha1(prefix.encode('utf-8')).hexdigest()
+        now = time.time()
+        with self.lock:
+            if key in self.unavailable:
+                return None
+            entry = self.entries.get(key)
+            if entry and entry[1] - REFRESH_MARGIN > now:
+                self.counters['hits'] += 1
+                return entry[0]
+
+        # Created outside the lock (a network call); concurrent misses for one key share it
+        try:
+            return self.flight.do(key, lambda: self._publish(prefix, key))
+        except Exception:
+            return None
+
+    def _publish(self, prefix, key):
+        try:
+            model = self._create(prefix, key)
+        except Exception as e:
+            # e.g. the prefix is below Gemini's minimum cacheable size; don't retry it
+            print(f"Context cache unavailable, sending the catalog inline: {e}")
+            with self.lock:
+                self.unavailable.add(key)
+                self.counters['failures'] += 1
+            raise
+
+        now = time.time()
+        with self.lock:
+            self.entries = {k: v for k, v in self.entries.items() if v[1] > now}
+            self.entries[key] = (model, now + self.ttl)
+            self.counters['created'] += 1
+        return model
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['contexts'] = len(self.entries)
+        stats['mode'] = self.mode
+        return stats
+
+
+def context_cache_from_env(model):
+    """The ContextCache configured by CONTEXT_CACHE, or None when it is off"""
+    if CONTEXT_CACHE_MODE not in ('gemini', 'local'):
+        return None
+    return ContextCache(model)
@@ -5,12 +5,31 @@ Voice-activated puzzle hint system
 """
 
 import os
-import pandas as pd
 import speech_recognition as sr
 import google.generativeai as genai
 from dotenv import load_dotenv
 import json
 import re
+from asr import SpeechToText, asr_backends_from_env, catalog_phrases
+from catalog import get_catalog
+from llm_client import LLMClient
+from prompts import CompiledPrompt
+
+MATCH_PROMPT = """
+        Available puzzles:
+        $puzzles
+        
+        User query: "$user_query"
+        
+        Match this user query to the closest puzzle from the list above. 
+        Return ONLY a JSON object with exactly these fields:
+        {"room": "exact room name", "puzzle_name": "exact puzzle name"}
+        
+        Use the exact room and puzzle_name text as they appear in the list.
+        """
+
+def build_match_prompt(snapshot):
+    return CompiledPrompt(MATCH_PROMPT, puzzles=snapshot.fragments['puzzle_list'])
 
 class EscapeRoomAssistant:
     def __init__(self):
@@ -21,21 +40,26 @@ class EscapeRoomAssistant:
         
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.llm = LLMClient(self.model)
         
         self.recognizer = sr.Recognizer()
         self.microphone = sr.Microphone()
         
-        self.puzzles_df = self.load_puzzles()
+        self.catalog = self.load_puzzles()
         self.setup_microphone()
+        
+        # Offline first when available, biased to the catalog's puzzle names; Google as fallback
+        self.stt = SpeechToText(asr_backends_from_env(
+            self.recognizer, lambda: self.catalog.current.get(catalog_phrases)
+        ))
     
     def load_puzzles(self):
-        """Load puzzle data from CSV file"""
-        try:
-            df = pd.read_csv('puzzles.csv')
-            print(f"Loaded {len(df)} puzzles from 4 rooms")
-            return df
-        except FileNotFoundError:
-            raise FileNotFoundError("puzzles.csv not found. Please ensure the file exists.")
+        """Load puzzle data from CSV file; later edits are picked up without a restart"""
+        catalog = get_catalog('puzzles.csv')
+        catalog.register(build_match_prompt)
+        catalog.register(catalog_phrases)
+        print(f"Loaded {len(catalog.current.puzzles)} puzzles from 4 rooms")
+        return catalog
     
     def setup_microphone(self):
         """Calibrate microphone for ambient noise"""
@@ -53,7 +77,7 @@ class EscapeRoomAssistant:
                 audio = self.recognizer.listen(source, timeout=10, phrase_time_limit=10)
             
             print("Processing speech...")
-            text = self.recognizer.recognize_google(audio)
+            text = self.stt.transcribe(audio)
             print(f"You said: '{text}'")
             return text.lower()
             
@@ -69,26 +93,24 @@ class EscapeRoomAssistant:
     
     def match_puzzle_with_gemini(self, user_query):
         """Use Gemini API to match user query to puzzle"""
-        puzzle_list = []
-        for _, row in self.puzzles_df.iterrows():
-            puzzle_list.append(f"Room: {row['room']}, Puzzle: {row['puzzle_name']}")
+        snapshot = self.catalog.current
         
-        prompt = f"""
-        Available puzzles:
-        {chr(10).join(puzzle_list)}
+        # Resolve locally when the keyword index is confident
+        room, puzzle_name = snapshot.index.best_match(user_query)
+        if room:
+            return room, puzzle_name
         
-        User query: "{user_query}"
+        # Misheard transcripts ("much room") are usually close in sound or spelling
+        room, puzzle_name, confidence = snapshot.fuzzy_index.best_match(user_query)
+        if room:
+            print(f"Fuzzy match: {puzzle_name} (confidence {confidence:.2f})")
+            return room, puzzle_name
         
-        Match this user query to the closest puzzle from the list above. 
-        Return ONLY a JSON object with exactly these fields:
-        {{"room": "exact room name", "puzzle_name": "exact puzzle name"}}
-        
-        Use the exact room and puzzle_name text as they appear in the list.
-        """
+        # The catalog part can be served from a Gemini context cache
+        prefix, prompt = snapshot.get(build_match_prompt).render_parts(user_query=user_query)
         
         try:
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
+            response_text = self.llm.generate_sync(prompt, prefix=prefix).strip()
             
             # Extract JSON from response
             json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
@@ -106,32 +128,17 @@ class EscapeRoomAssistant:
     
     def get_puzzle_hints(self, room, puzzle_name):
         """Retrieve hints for the matched puzzle"""
-        try:
-            puzzle = self.puzzles_df[
-                (self.puzzles_df['room'] == room) & 
-                (self.puzzles_df['puzzle_name'] == puzzle_name)
-            ]
-            
-            if puzzle.empty:
-                return None
-            
-            puzzle_row = puzzle.iloc[0]
-            hints = []
-            for i in range(1, 5):
-                hint = puzzle_row.get(f'hint{i}')
-                if pd.notna(hint) and hint.strip():
-                    hints.append(f"Hint {i}: {hint}")
-            
-            return puzzle_row, hints
-            
-        except Exception as e:
-            print(f"Error retrieving hints: {e}")
+        puzzle = self.catalog.current.puzzles.get(room, puzzle_name)
+        if puzzle is None:
             return None
+        
+        hints = [f"Hint {i}: {hint}" for i, hint in enumerate(puzzle.hints, 1)]
+        return puzzle, hints
     
-    def display_hints(self, puzzle_row, hints):
+    def display_hints(self, puzzle, hints):
         """Display puzzle information and hints"""
         print(f"\n{'='*60}")
-        print(f"You're working on the {puzzle_row['puzzle_name']} in {puzzle_row['room']}.")
+        print(f"You're working on the {puzzle.puzzle_name} in {puzzle.room}.")
         print(f"{'='*60}")
         
         for hint in hints:
@@ -172,8 +179,8 @@ class EscapeRoomAssistant:
                 # Get and display hints
                 result = self.get_puzzle_hints(room, puzzle_name)
                 if result:
-                    puzzle_row, hints = result
-                    self.display_hints(puzzle_row, hints)
+                    puzzle, hints = result
+                    self.display_hints(puzzle, hints)
                 else:
                     print("Sorry, I couldn't find that puzzle in the database.")
                 
@@ -5,17 +5,61 @@ Runs continuously in the background, always listening for voice commands
 """
 
 import os
-import pandas as pd
 import speech_recognition as sr
 import google.generativeai as genai
 from dotenv import load_dotenv
 import json
 import re
+from asr import SpeechToText, asr_backends_from_env, catalog_phrases
+from catalog import get_catalog
+from llm_client import LLMClient
+from prompts import CompiledPrompt
 import time
 import threading
 from datetime import datetime
 
+from audio_capture import AudioCapture, UtteranceSegmenter
+from pipeline import BLOCK, DROP_OLDEST, Pipeline, Stage
+
+# Seconds after a wake word during which the next utterance is taken as the query
+ACTIVATION_WINDOW = float(os.getenv('ACTIVATION_WINDOW', '10'))
+
+# Workers and queue size per stage. A full ASR queue drops its oldest utterance rather than
+# stall the microphone; later stages block the one before them instead.
+ASR_WORKERS = int(os.getenv('ASR_WORKERS', '3'))
+ASR_QUEUE = int(os.getenv('ASR_QUEUE', '16'))
+MATCH_WORKERS = int(os.getenv('MATCH_WORKERS', '2'))
+MATCH_QUEUE = int(os.getenv('MATCH_QUEUE', '8'))
+OUTPUT_QUEUE = 32
+
+try:
+    from wake_word import SAMPLE_RATE, WakeWordSpotter
+except ImportError:
+    # pocketsphinx not installed: wake words are found in full transcripts instead
+    WakeWordSpotter = None
+    SAMPLE_RATE = None
+
+MATCH_PROMPT = """
+        Available puzzles:
+        $puzzles
+        
+        User query: "$user_query"
+        
+        Match this user query to the closest puzzle from the list above. 
+        Return ONLY a JSON object with exactly these fields:
+        {"room": "exact room name", "puzzle_name": "exact puzzle name"}
+        
+        Use the exact room and puzzle_name text as they appear in the list.
+        """
+
+def build_match_prompt(snapshot):
+    return CompiledPrompt(MATCH_PROMPT, puzzles=snapshot.fragments['puzzle_list'])
+
 class EscapeRoomAIService:
+    # Wake words to activate the assistant
+    wake_words = ['escape room', 'puzzle help', 'ai assistant', 'help me']
+    shutdown_phrases = ['shutdown assistant', 'stop service']
+    
     def __init__(self):
         load_dotenv()
         self.api_key = os.getenv('GOOGLE_API_KEY')
@@ -24,16 +68,37 @@ class EscapeRoomAIService:
         
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.llm = LLMClient(self.model)
         
         self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        self.microphone = sr.Microphone(sample_rate=SAMPLE_RATE)
         
-        self.puzzles_df = self.load_puzzles()
+        self.catalog = self.load_puzzles()
         self.setup_microphone()
+        self.capture = AudioCapture(self.microphone)
+        
+        # Offline first when available, biased to the catalog's puzzle names; Google as fallback
+        self.stt = SpeechToText(asr_backends_from_env(
+            self.recognizer, lambda: self.catalog.current.get(catalog_phrases)
+        ))
         self.running = True
+        self.awake_until = 0
+        self.awake_lock = threading.Lock()
+        
+        # Recognition and Gemini run on their own workers so the capture loop never waits;
+        # a burst of utterances is transcribed and matched concurrently
+        self.pipeline = Pipeline(
+            Stage('asr', self.transcribe, ASR_WORKERS, ASR_QUEUE, policy=DROP_OLDEST),
+            Stage('match', self.process_query, MATCH_WORKERS, MATCH_QUEUE, policy=BLOCK),
+            Stage('output', self.display_hints, 1, OUTPUT_QUEUE, policy=BLOCK),
+        )
         
-        # Wake words to activate the assistant
-        self.wake_words = ['escape room', 'puzzle help', 'ai assistant', 'help me']
+        # Spotted locally, so only speech after a wake word goes to the cloud
+        self.spotter = None
+        if WakeWordSpotter:
+            self.spotter = WakeWordSpotter(self.wake_words + self.shutdown_phrases)
+        else:
+            self.log("pocketsphinx not installed; spotting wake words in full transcripts")
     
     def log(self, message):
         """Log messages with timestamp"""
@@ -41,13 +106,12 @@ class EscapeRoomAIService:
         print(f"[{timestamp}] {message}")
     
     def load_puzzles(self):
-        """Load puzzle data from CSV file"""
-        try:
-            df = pd.read_csv('puzzles.csv')
-            self.log(f"Loaded {len(df)} puzzles from 4 rooms")
-            return df
-        except FileNotFoundError:
-            raise FileNotFoundError("puzzles.csv not found. Please ensure the file exists.")
+        """Load puzzle data from CSV file; later edits are picked up without a restart"""
+        catalog = get_catalog('puzzles.csv')
+        catalog.register(build_match_prompt)
+        catalog.register(catalog_phrases)
+        self.log(f"Loaded {len(catalog.current.puzzles)} puzzles from 4 rooms")
+        return catalog
     
     def setup_microphone(self):
         """Calibrate microphone for ambient noise"""
@@ -61,98 +125,124 @@ class EscapeRoomAIService:
         self.log("Starting continuous listening mode...")
         self.log("Say 'escape room' or 'puzzle help' to activate, then describe your puzzle")
         
-        while self.running:
-            try:
-                with self.microphone as source:
-                    # Listen for wake word with shorter timeout
-                    audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=5)
-                
-                text = self.recognizer.recognize_google(audio).lower()
-                
-                # Check for wake words
-                if any(wake_word in text for wake_word in self.wake_words):
-                    self.log(f"Wake word detected: '{text}'")
-                    self.handle_activated_session()
+        # One microphone stream for the whole run; nothing said between utterances is lost
+        self.capture.start()
+        self.pipeline.start()
+        segmenter = UtteranceSegmenter(self.capture.frame_seconds, self.recognizer.energy_threshold)
+        
+        try:
+            # Capture stage: only the spotter and VAD run here, so the mic is never left unread
+            for frame in self.capture.frames():
+                if not self.running:
+                    break
                 
-                # Check for shutdown command
-                elif 'shutdown assistant' in text or 'stop service' in text:
+                phrase = self.spotter.feed(frame) if self.spotter else None
+                if phrase in self.shutdown_phrases:
                     self.log("Shutdown command received")
                     self.running = False
                     break
-                    
-            except sr.WaitTimeoutError:
-                # Normal timeout, continue listening
-                continue
-            except sr.UnknownValueError:
-                # Could not understand speech, continue listening
-                continue
-            except sr.RequestError as e:
-                self.log(f"Speech recognition error: {e}")
-                time.sleep(5)  # Wait before retrying
-            except Exception as e:
-                self.log(f"Unexpected error: {e}")
-                time.sleep(5)
+                if phrase:
+                    # The utterance this frame belongs to may hold the query as well
+                    self.log(f"Wake word detected: '{phrase}'")
+                    self.wake(ACTIVATION_WINDOW)
+                
+                utterance = segmenter.feed(frame)
+                if utterance is None:
+                    continue
+                awake = self.is_awake()
+                # Without the offline spotter every utterance is checked in the cloud, as before
+                if self.spotter and not awake:
+                    continue
+                self.pipeline.put((utterance, awake))
+        finally:
+            self.capture.stop()
+            self.pipeline.stop()
+            self.log(f"Pipeline: {json.dumps(self.pipeline.stats())}; "
+                     f"{self.capture.dropped} audio frames dropped")
     
-    def handle_activated_session(self):
-        """Handle an activated session after wake word detection"""
-        self.log("Assistant activated! Describe your puzzle problem...")
+    def wake(self, seconds):
+        """Take utterances as queries for the next seconds (0 to go back to waiting)"""
+        with self.awake_lock:
+            self.awake_until = time.time() + seconds
+    
+    def is_awake(self):
+        with self.awake_lock:
+            return time.time() <= self.awake_until
+    
+    def transcribe(self, item):
+        """ASR stage: the query in an utterance, or None
         
+        The wake word and the query can come in one breath ("escape room, I'm stuck on
+        the bells") or as two utterances within ACTIVATION_WINDOW seconds.
+        """
+        utterance, awake = item
+        audio = sr.AudioData(utterance, self.capture.sample_rate, self.capture.sample_width)
         try:
-            # Listen for the actual query with longer timeout
-            with self.microphone as source:
-                audio = self.recognizer.listen(source, timeout=10, phrase_time_limit=15)
-            
-            user_query = self.recognizer.recognize_google(audio)
-            self.log(f"Query received: '{user_query}'")
-            
-            # Process the query
-            self.process_query(user_query)
-            
-        except sr.WaitTimeoutError:
-            self.log("No query received after activation")
+            text = self.stt.transcribe(audio)
         except sr.UnknownValueError:
-            self.log("Could not understand the query")
-        except Exception as e:
-            self.log(f"Error processing activated session: {e}")
+            if awake:
+                self.log("Could not understand the query")
+            return None
+        except sr.RequestError as e:
+            self.log(f"Speech recognition error: {e}")
+            return None
+        
+        lowered = text.lower()
+        if not self.spotter and any(phrase in lowered for phrase in self.shutdown_phrases):
+            self.log("Shutdown command received")
+            self.running = False
+            return None
+        
+        wake_word = next((w for w in self.wake_words if w in lowered), None)
+        if wake_word:
+            # Keep what was said after the wake word
+            text = text[lowered.index(wake_word) + len(wake_word):].strip(" ,.!?")
+        elif not (awake or self.is_awake()):
+            return None
+        
+        if not text:
+            self.log("Assistant activated! Describe your puzzle problem...")
+            self.wake(ACTIVATION_WINDOW)
+            return None
+        
+        self.log(f"Query received: '{text}'")
+        self.wake(0)
+        return text
     
     def process_query(self, user_query):
-        """Process the user query and provide hints"""
+        """Match stage: the matched puzzle and its hints, or None"""
         self.log("Finding matching puzzle...")
         room, puzzle_name = self.match_puzzle_with_gemini(user_query)
         
         if not room or not puzzle_name:
             self.log("Could not match query to a puzzle")
-            return
+            return None
         
         result = self.get_puzzle_hints(room, puzzle_name)
-        if result:
-            puzzle_row, hints = result
-            self.display_hints(puzzle_row, hints)
-        else:
+        if not result:
             self.log("Could not find puzzle in database")
+        return result
     
     def match_puzzle_with_gemini(self, user_query):
         """Use Gemini API to match user query to puzzle"""
-        puzzle_list = []
-        for _, row in self.puzzles_df.iterrows():
-            puzzle_list.append(f"Room: {row['room']}, Puzzle: {row['puzzle_name']}")
+        snapshot = self.catalog.current
         
-        prompt = f"""
-        Available puzzles:
-        {chr(10).join(puzzle_list)}
+        # Resolve locally when the keyword index is confident
+        room, puzzle_name = snapshot.index.best_match(user_query)
+        if room:
+            return room, puzzle_name
         
-        User query: "{user_query}"
+        # Misheard transcripts ("much room") are usually close in sound or spelling
+        room, puzzle_name, confidence = snapshot.fuzzy_index.best_match(user_query)
+        if room:
+            self.log(f"Fuzzy match: {puzzle_name} (confidence {confidence:.2f})")
+            return room, puzzle_name
         
-        Match this user query to the closest puzzle from the list above. 
-        Return ONLY a JSON object with exactly these fields:
-        {{"room": "exact room name", "puzzle_name": "exact puzzle name"}}
-        
-        Use the exact room and puzzle_name text as they appear in the list.
-        """
+        # The catalog part can be served from a Gemini context cache
+        prefix, prompt = snapshot.get(build_match_prompt).render_parts(user_query=user_query)
         
         try:
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
+            response_text = self.llm.generate_sync(prompt, prefix=prefix).strip()
             
             json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
             if json_match:
@@ -169,31 +259,17 @@ class EscapeRoomAIService:
     
     def get_puzzle_hints(self, room, puzzle_name):
         """Retrieve hints for the matched puzzle"""
-        try:
-            puzzle = self.puzzles_df[
-                (self.puzzles_df['room'] == room) & 
-                (self.puzzles_df['puzzle_name'] == puzzle_name)
-            ]
-            
-            if puzzle.empty:
-                return None
-            
-            puzzle_row = puzzle.iloc[0]
-            hints = []
-            for i in range(1, 5):
-                hint = puzzle_row.get(f'hint{i}')
-                if pd.notna(hint) and hint.strip():
-                    hints.append(f"Hint {i}: {hint}")
-            
-            return puzzle_row, hints
-            
-        except Exception as e:
-            self.log(f"Error retrieving hints: {e}")
+        puzzle = self.catalog.current.puzzles.get(room, puzzle_name)
+        if puzzle is None:
             return None
+        
+        hints = [f"Hint {i}: {hint}" for i, hint in enumerate(puzzle.hints, 1)]
+        return puzzle, hints
     
-    def display_hints(self, puzzle_row, hints):
-        """Display puzzle information and hints"""
-        self.log(f"PUZZLE FOUND: {puzzle_row['puzzle_name']} in {puzzle_row['room']}")
+    def display_hints(self, result):
+        """Output stage: display puzzle information and hints"""
+        puzzle, hints = result
+        self.log(f"PUZZLE FOUND: {puzzle.puzzle_name} in {puzzle.room}")
         for hint in hints:
             self.log(hint)
         if not hints:
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Fuzzy Puzzle Index
+Phonetic and character n-gram matcher for misheard voice transcripts
+"""
+
+import math
+import os
+import re
+from collections import defaultdict
+
+from puzzle_index import STOP_WORDS, normalize_token
+
+# Minimum confidence before a fuzzy match is trusted over Gemini
+DEFAULT_THRESHOLD = float(os.getenv('FUZZY_MATCH_THRESHOLD', '0.75'))
+
+# Term pairs scoring below this are not considered a match at all
+MIN_SIMILARITY = 0.6
+
+WORD_RE = re.compile(r"[a-z]+")
+
+# Ordered rewrite rules; voiced/unvoiced pairs are merged since ASR confuses them
+PHONETIC_RULES = [
+    ('ph', 'f'), ('ck', 'k'), ('sch', 'sk'), ('sh', 'x'), ('ch', 'x'), ('th', 't'),
+    ('gh', ''), ('kn', 'n'), ('wr', 'r'), ('qu', 'kw'),
+    ('ce', 'se'), ('ci', 'si'), ('cy', 'sy'),
+    ('c', 'k'), ('q', 'k'), ('g', 'k'), ('d', 't'), ('b', 'p'), ('v', 'f'), ('z', 's'),
+]
+
+VOWELS = set('aeiou')
+
+
+def phonetic_key(word):
+    """Return a Metaphone-style key, e.g. 'mushroom' and 'muchroom' -> 'mxrm'"""
+    word = word.lower()
+    for pattern, replacement in PHONETIC_RULES:
+        word = word.replace(pattern, replacement)
+
+    key = []
+    for i, char in enumerate(word):
+        if char in VOWELS or char in 'hwy':
+            # Keep a leading vowel so 'elements' and 'lements' stay apart
+            if i == 0 and char in VOWELS:
+                key.append('a')
+            continue
+        if key and key[-1] == char:
+            continue
+        key.append(char)
+    return ''.join(key)
+
+
+def ngrams(text, n=3):
+    """Return the set of padded character n-grams for a string"""
+    padded = f"^{text}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def dice(left, right):
+    """Dice coefficient between two n-gram sets"""
+    if not left or not right:
+        return 0.0
+    return 2 * len(left & right) / (len(left) + len(right))
+
+
+class FuzzyIndex:
+    """Character n-gram and phonetic index over puzzle names and keywords"""
+
+    def __init__(self, puzzles):
+        self.docs = []
+        self.terms = {}
+        self.term_docs = defaultdict(set)
+        self.gram_terms = defaultdict(set)
+
+        for puzzle in puzzles:
+            doc_id = len(self.docs)
+            self.docs.append((puzzle.room, puzzle.puzzle_name))
+            for term in self._puzzle_terms(puzzle):
+                self.term_docs[term].add(doc_id)
+
+        for term in self.term_docs:
+            key = phonetic_key(term)
+            spelling, sound = ngrams(term), ngrams(key, 2)
+            self.terms[term] = (key, spelling, sound)
+            for gram in spelling:
+                self.gram_terms[f"s{gram}"].add(term)
+            for gram in sound:
+                self.gram_terms[f"p{gram}"].add(term)
+
+        total = len(self.docs)
+        self.idf = {
+            term: math.log(1 + total / len(doc_ids))
+            for term, doc_ids in self.term_docs.items()
+        }
+
+    @staticmethod
+    def _puzzle_terms(puzzle):
+        """Single words plus joined multi-word phrases from name and keywords"""
+        phrases = []
+        for value in (puzzle.puzzle_name, puzzle.keywords):
+            phrases.extend(re.split(r"[,()&]", value.lower()))
+
+        terms = set()
+        for phrase in phrases:
+            words = [normalize_token(w) for w in WORD_RE.findall(phrase)]
+            words = [w for w in words if w not in STOP_WORDS]
+            terms.update(w for w in words if len(w) >= 3)
+            if len(words) > 1:
+                terms.add(''.join(words))
+        return terms
+
+    def _candidates(self, query):
+        """Query words plus adjacent joins, so 'much room' also tries 'muchroom'"""
+        words = [normalize_token(w) for w in WORD_RE.findall(query.lower())]
+        candidates = {w for w in words if len(w) >= 3 and w not in STOP_WORDS}
+        for size in (2, 3):
+            for i in range(len(words) - size + 1):
+                group = words[i:i + size]
+                if any(w not in STOP_WORDS for w in group):
+                    candidates.add(''.join(group))
+        return candidates
+
+    def _term_matches(self, candidate):
+        """Yield (term, similarity) for catalog terms close to a query candidate"""
+        key = phonetic_key(candidate)
+        spelling, sound = ngrams(candidate), ngrams(key, 2)
+
+        seen = set()
+        for gram in spelling:
+            seen.update(self.gram_terms.get(f"s{gram}", ()))
+        for gram in sound:
+            seen.update(self.gram_terms.get(f"p{gram}", ()))
+
+        for term in seen:
+            term_key, term_spelling, term_sound = self.terms[term]
+            similarity = dice(spelling, term_spelling)
+            if len(key) >= 3 and key == term_key:
+                similarity = max(similarity, 0.9)
+            elif len(key) >= 4 and len(term_key) >= 4:
+                similarity = max(similarity, 0.8 * dice(sound, term_sound))
+            if similarity >= MIN_SIMILARITY:
+                yield term, similarity
+
+    def search(self, query, limit=5):
+        """Return a ranked list of (room, puzzle_name, confidence) for a query"""
+        # Keep each catalog term's best similarity so overlapping joins don't double count
+        term_scores = {}
+        for candidate in self._candidates(query):
+            for term, similarity in self._term_matches(candidate):
+                term_scores[term] = max(term_scores.get(term, 0.0), similarity)
+
+        scores = defaultdict(float)
+        best = defaultdict(float)
+        for term, similarity in term_scores.items():
+            for doc_id in self.term_docs[term]:
+                scores[doc_id] += similarity * self.idf[term]
+                best[doc_id] = max(best[doc_id], similarity)
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        results = []
+        for doc_id in ranked[:limit]:
+            # Confidence drops as other puzzles score close to this one
+            rival = max((scores[other] for other in ranked[:limit + 1] if other != doc_id), default=0.0)
+            dominance = max(0.0, min(1.0, 2 * (scores[doc_id] - rival) / scores[doc_id]))
+            results.append((*self.docs[doc_id], round(best[doc_id] * dominance, 3)))
+        return results
+
+    def best_match(self, query, threshold=DEFAULT_THRESHOLD):
+        """Return (room, puzzle_name, confidence); room and name are None below threshold"""
+        results = self.search(query, limit=2)
+        if not results:
+            return None, None, 0.0
+
+        room, puzzle_name, confidence = results[0]
+        if confidence < threshold:
+            return None, None, confidence
+        return room, puzzle_name, confidence
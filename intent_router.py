@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Intent Router
+Classifies chat messages locally so catalog answers never wait on Gemini
+"""
+
+import re
+import threading
+
+NEXT_HINT = 'next_hint'
+NEW_PUZZLE = 'new_puzzle'
+REPEAT = 'repeat'
+SMALL_TALK = 'small_talk'
+UNKNOWN = 'unknown'
+
+INTENTS = (NEXT_HINT, NEW_PUZZLE, REPEAT, SMALL_TALK, UNKNOWN)
+
+WORD_RE = re.compile(r"[a-z']+")
+
+# An explicit request for (more) help; enough for the next hint on the current puzzle
+HINT_WORDS = frozenset({
+    'help', 'hint', 'hints', 'stuck', 'clue', 'clues', 'another', 'next', 'more',
+})
+
+# Only ask for a hint when the message also names the puzzle ("how do the bells work");
+# other questions ("what time is it") go to Gemini
+QUESTION_WORDS = frozenset({'how', 'what'})
+
+REPEAT_PHRASES = (
+    'again', 'repeat', 'say that', "didn't catch", 'didnt catch', 'what was that',
+    'one more time', 'pardon',
+)
+# Whole words only: 'against' is not a request to repeat
+REPEAT_RE = re.compile(r"\b(?:" + '|'.join(re.escape(phrase) for phrase in REPEAT_PHRASES) + r")\b")
+
+SMALL_TALK_WORDS = frozenset({
+    'hi', 'hello', 'hey', 'yo', 'thanks', 'thank', 'you', 'thx', 'cheers', 'ok', 'okay',
+    'cool', 'great', 'nice', 'awesome', 'good', 'morning', 'afternoon', 'evening', 'bye',
+    'goodbye', 'got', 'it', 'gotcha', 'sure', 'yes', 'yeah', 'yep', 'lol', 'haha', 'so', 'much',
+    'there', 'please', 'all', 'everyone',
+})
+
+# Greetings phrased as questions, answered locally rather than by Gemini
+SMALL_TALK_PHRASES = ('how are you', "how's it going", 'how is it going', "what's up", 'whats up')
+
+
+class Intent:
+    """What a message asks for, and the puzzle it concerns (if any)"""
+
+    __slots__ = ('kind', 'puzzle')
+
+    def __init__(self, kind, puzzle=None):
+        self.kind = kind
+        self.puzzle = puzzle
+
+    def __repr__(self):
+        return f"Intent({self.kind!r}, {self.puzzle!r})"
+
+
+def puzzle_for_key(snapshot, key):
+    """The puzzle with this session key ('Room 2_Distaff Wheel Alignment'), or None"""
+    if not key:
+        return None
+    return snapshot.puzzles.get_by_session_key(key)
+
+
+class IntentRouter:
+    """Rule-based classifier plus counters of its decisions"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {kind: 0 for kind in INTENTS}
+        self.counters['llm_calls_saved'] = 0
+
+    def classify(self, message, snapshot, current_key=None):
+        """Intent for a message given the puzzle the conversation is on"""
+        text = message.lower()
+        words = WORD_RE.findall(text)
+        current = puzzle_for_key(snapshot, current_key)
+
+        room, puzzle_name = snapshot.index.best_match(message)
+        named = snapshot.puzzles.get(room, puzzle_name) if room else None
+        # Help words inside a repeat phrase ('one more time') don't ask for the next hint
+        asks_repeat = bool(REPEAT_RE.search(text))
+        request_words = WORD_RE.findall(REPEAT_RE.sub(' ', text))
+        asks_more = any(word in HINT_WORDS for word in request_words)
+        asks_help = asks_more or any(word in QUESTION_WORDS for word in request_words)
+
+        if not words:
+            intent = Intent(UNKNOWN)
+        elif named and named is not current:
+            intent = Intent(NEW_PUZZLE if asks_help else UNKNOWN, named)
+        elif not named and any(phrase in text for phrase in SMALL_TALK_PHRASES):
+            intent = Intent(SMALL_TALK)
+        elif current and (asks_more or (named and asks_help)):
+            # An explicit request for the next hint wins over 'again' ("tried again, next hint")
+            intent = Intent(NEXT_HINT, current)
+        elif current and asks_repeat:
+            intent = Intent(REPEAT, current)
+        elif not named and all(word in SMALL_TALK_WORDS for word in words):
+            intent = Intent(SMALL_TALK)
+        else:
+            intent = Intent(UNKNOWN, named or current)
+        return intent
+
+    def record(self, intent, answered_locally):
+        """Count a routing decision; a local answer is one Gemini call saved"""
+        with self.lock:
+            self.counters[intent.kind] += 1
+            if answered_locally:
+                self.counters['llm_calls_saved'] += 1
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        routed = sum(stats[kind] for kind in INTENTS)
+        stats['local_rate'] = round(stats['llm_calls_saved'] / routed, 3) if routed else 0.0
+        return stats
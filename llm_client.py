@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - LLM Client
+Async Gemini calls with a deadline, jittered retries and optional hedged requests
+"""
+
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+from google.api_core import exceptions as api_exceptions
+
+from context_cache import context_cache_from_env
+
+# Overall budget per call, retries and hedges included
+DEFAULT_DEADLINE = float(os.getenv('LLM_DEADLINE', '10'))
+DEFAULT_RETRIES = int(os.getenv('LLM_RETRIES', '2'))
+RETRY_BASE_DELAY = 0.25
+
+# Hedging: if the first request is slower than the recent p95, send a second one
+HEDGE_ENABLED = os.getenv('LLM_HEDGE', '0') == '1'
+HEDGE_DELAY = float(os.getenv('LLM_HEDGE_DELAY', '2'))  # used until there are enough samples
+HEDGE_PERCENTILE = 0.95
+MIN_HEDGE_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+# Errors worth another attempt; anything else (bad request, blocked prompt) is raised at once
+TRANSIENT_ERRORS = (
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.TooManyRequests,
+    api_exceptions.ResourceExhausted,
+    api_exceptions.DeadlineExceeded,
+    ConnectionError,
+)
+
+
+class LLMTimeout(Exception):
+    """Raised when no answer arrived within the call's deadline"""
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def background_loop():
+    """Event loop on a daemon thread that runs calls made from synchronous code
+
+    The Gemini async client binds to the loop it first runs on, so every
+    synchronous call goes through this one loop rather than asyncio.run().
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='llm-loop', daemon=True).start()
+        return _loop
+
+
+class LLMClient:
+    """Wraps a GenerativeModel; generate() is async, generate_sync() blocks
+
+    Calls may pass a static prompt prefix separately. With a context cache
+    (CONTEXT_CACHE=gemini) the prefix is uploaded once and only the rest of
+    the prompt is sent; otherwise the two are simply joined.
+    """
+
+    def __init__(self, model, deadline=DEFAULT_DEADLINE, retries=DEFAULT_RETRIES, hedge=HEDGE_ENABLED,
+                 context_cache=None):
+        self.model = model
+        self.context_cache = context_cache or context_cache_from_env(model)
+        self.deadline = deadline
+        self.retries = retries
+        self.hedge = hedge
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.lock = threading.Lock()
+        self.counters = {'calls': 0, 'retries': 0, 'hedged': 0, 'hedge_wins': 0, 'timeouts': 0}
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _percentile(self, fraction):
+        with self.lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+    def hedge_delay(self):
+        """Recent p95 latency, or HEDGE_DELAY until enough calls have been timed"""
+        if len(self.latencies) < MIN_HEDGE_SAMPLES:
+            return HEDGE_DELAY
+        return self._percentile(HEDGE_PERCENTILE)
+
+    async def _model_for(self, prompt, prefix):
+        """The model to call and the prompt to send it"""
+        if prefix and self.context_cache:
+            # Creating a cache is a blocking API call; keep it off the event loop
+            loop = asyncio.get_running_loop()
+            cached = await loop.run_in_executor(None, self.context_cache.model_for, prefix)
+            if cached:
+                return cached, prompt
+        return self.model, prefix + prompt
+
+    async def _call(self, prompt, prefix=''):
+        start = time.monotonic()
+        model, prompt = await self._model_for(prompt, prefix)
+        response = await model.generate_content_async(prompt)
+        text = response.text
+        with self.lock:
+            self.latencies.append(time.monotonic() - start)
+        return text
+
+    async def _hedged_call(self, prompt, prefix):
+        """One request, plus a duplicate if the first is slower than usual"""
+        first = asyncio.ensure_future(self._call(prompt, prefix))
+        if not self.hedge:
+            return await first
+
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay())
+            if done:
+                return first.result()
+
+            self._count('hedged')
+            second = asyncio.ensure_future(self._call(prompt, prefix))
+            tasks.append(second)
+            pending = set(tasks)
+            errors = []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._count('hedge_wins')
+                        return task.result()
+                    errors.append(task.exception())
+            raise errors[0]
+        finally:
+            # The loser, or both if the deadline cancelled us
+            for task in tasks:
+                task.cancel()
+
+    async def _attempts(self, prompt, prefix):
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._hedged_call(prompt, prefix)
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.retries:
+                    raise
+                self._count('retries')
+                # Full jitter so clients that failed together don't retry together
+                delay = random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt)
+                print(f"Gemini transient error ({type(e).__name__}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def generate(self, prompt, deadline=None, prefix=''):
+        """Response text for prefix + prompt; raises LLMTimeout once the deadline has passed"""
+        deadline = deadline or self.deadline
+        self._count('calls')
+        try:
+            return await asyncio.wait_for(self._attempts(prompt, prefix), deadline)
+        except asyncio.TimeoutError:
+            self._count('timeouts')
+            raise LLMTimeout(f"Gemini did not answer within {deadline:.1f}s") from None
+
+    def generate_sync(self, prompt, deadline=None, prefix=''):
+        """Blocking generate() for Flask handlers and the voice loops"""
+        future = asyncio.run_coroutine_threadsafe(self.generate(prompt, deadline, prefix), background_loop())
+        return future.result()
+
+    async def _open_stream(self, prompt):
+        """Start a streamed response and wait for its first chunk, retrying transient errors"""
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.model.generate_content_async(prompt, stream=True)
+                chunks = response.__aiter__()
+                try:
+                    return chunks, await chunks.__anext__()
+                except StopAsyncIteration:
+                    return chunks, None
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.retries:
+                    raise
+                self._count('retries')
+                delay = random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt)
+                print(f"Gemini transient error ({type(e).__name__}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def stream(self, prompt, deadline=None):
+        """Yield response text as Gemini generates it
+
+        Retries only happen before the first chunk; once text has been
+        yielded a failure is raised. The deadline covers the whole stream.
+        """
+        deadline = deadline or self.deadline
+        self._count('calls')
+        expires = time.monotonic() + deadline
+        try:
+            chunks, chunk = await asyncio.wait_for(self._open_stream(prompt), deadline)
+            while chunk is not None:
+                yield chunk.text
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(expires - time.monotonic(), 0))
+                except StopAsyncIteration:
+                    chunk = None
+        except asyncio.TimeoutError:
+            self._count('timeouts')
+            raise LLMTimeout(f"Gemini did not finish within {deadline:.1f}s") from None
+
+    def stream_sync(self, prompt, deadline=None):
+        """Blocking iterator over stream() for Flask streaming responses"""
+        chunks = queue.Queue()
+        end = object()
+
+        async def pump():
+            try:
+                async for text in self.stream(prompt, deadline):
+                    chunks.put(text)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(end)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), background_loop())
+        try:
+            while True:
+                item = chunks.get()
+                if item is end:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stop pulling from Gemini if the browser went away mid-stream
+            future.cancel()
+
+    def stats(self):
+        """Call counters plus p50/p95 latency in ms"""
+        with self.lock:
+            stats = dict(self.counters)
+        for name, fraction in (('p50_ms', 0.5), ('p95_ms', HEDGE_PERCENTILE)):
+            value = self._percentile(fraction)
+            stats[name] = round(value * 1000) if value is not None else None
+        if self.context_cache:
+            stats['context_cache'] = self.context_cache.stats()
+        return stats
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Match Cache
+Persistent LRU cache of query -> (room, puzzle_name) results
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from puzzle_index import tokenize
+
+DEFAULT_PATH = os.getenv('MATCH_CACHE_PATH', 'match_cache.json')
+DEFAULT_MAX_ENTRIES = int(os.getenv('MATCH_CACHE_SIZE', '1000'))
+DEFAULT_TTL = float(os.getenv('MATCH_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Write to disk at most this often; the rest is flushed at exit
+SAVE_INTERVAL = 30
+
+
+def canonical_query(query):
+    """Canonical cache key: 'I'm stuck on room two's mushroom' -> 'mushroom room2'"""
+    return ' '.join(sorted(set(tokenize(query))))
+
+
+def file_fingerprint(path):
+    """SHA-1 of a file's contents, or None if it does not exist"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+class MatchCache:
+    """LRU + TTL cache persisted to JSON and tied to a version of puzzles.csv"""
+
+    def __init__(self, catalog_path='puzzles.csv', path=DEFAULT_PATH,
+                 max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.catalog_path = catalog_path
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0, 'invalidations': 0}
+
+        self.catalog_stat = None
+        self.fingerprint = None
+        self.dirty = False
+        self.last_save = 0.0
+
+        self._check_catalog()
+        self.load()
+        atexit.register(self.save)
+
+    def _check_catalog(self):
+        """Drop all entries when puzzles.csv has changed since they were stored"""
+        try:
+            stat = os.stat(self.catalog_path)
+            stat = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stat = None
+        if stat == self.catalog_stat:
+            return
+
+        self.catalog_stat = stat
+        fingerprint = file_fingerprint(self.catalog_path)
+        if fingerprint != self.fingerprint:
+            if self.entries:
+                self.entries.clear()
+                self.counters['invalidations'] += 1
+                self.dirty = True
+            self.fingerprint = fingerprint
+
+    def get(self, query):
+        """Return cached (room, puzzle_name) or None"""
+        key = canonical_query(query)
+        with self.lock:
+            self._check_catalog()
+            entry = self.entries.get(key)
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+
+            room, puzzle_name, stored_at = entry
+            if time.time() - stored_at > self.ttl:
+                del self.entries[key]
+                self.counters['expired'] += 1
+                self.counters['misses'] += 1
+                self.dirty = True
+                return None
+
+            self.entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return room, puzzle_name
+
+    def put(self, query, room, puzzle_name):
+        """Store a successful match"""
+        key = canonical_query(query)
+        if not key or not room or not puzzle_name:
+            return
+        with self.lock:
+            self._check_catalog()
+            self.entries[key] = (room, puzzle_name, time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters['evicted'] += 1
+            self.dirty = True
+        if time.time() - self.last_save > SAVE_INTERVAL:
+            self.save()
+
+    def load(self):
+        """Warm the cache from disk, ignoring entries for another catalog version"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+
+        if data.get('catalog') != self.fingerprint:
+            return
+        now = time.time()
+        with self.lock:
+            for key, room, puzzle_name, stored_at in data.get('entries', [])[-self.max_entries:]:
+                if now - stored_at <= self.ttl:
+                    self.entries[key] = (room, puzzle_name, stored_at)
+
+    def save(self):
+        """Atomically write the cache to disk if it changed"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {
+                'catalog': self.fingerprint,
+                'entries': [[key, *entry] for key, entry in self.entries.items()],
+            }
+            self.dirty = False
+            self.last_save = time.time()
+
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save match cache: {e}")
+
+    def stats(self):
+        """Hit/miss counters plus current size"""
+        with self.lock:
+            stats = dict(self.counters)
+            stats['size'] = len(self.entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Pipeline
+Stages joined by bounded queues, each with its own worker threads and overflow policy
+"""
+
+import queue
+import threading
+
+# What put() does when a stage's queue is full
+BLOCK = 'block'              # wait for room (backpressure on the stage before)
+DROP_OLDEST = 'drop_oldest'  # discard the longest-waiting item; never blocks
+DROP_NEWEST = 'drop_newest'  # discard the item being added; never blocks
+
+_STOP = object()
+
+
+class Stage:
+    """handler(item) runs on workers threads; a non-None result goes to the next stage"""
+
+    def __init__(self, name, handler, workers=1, maxsize=8, policy=BLOCK):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.policy = policy
+        self.queue = queue.Queue(maxsize)
+        self.next = None
+        self.threads = []
+        self.lock = threading.Lock()
+        self.counters = {'processed': 0, 'dropped': 0, 'errors': 0, 'busy': 0}
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def put(self, item):
+        """Queue item, applying the overflow policy if the queue is full"""
+        if self.policy == BLOCK:
+            self.queue.put(item)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                if self.policy == DROP_NEWEST:
+                    self._count('dropped')
+                    return
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self._count('dropped')
+            except queue.Empty:
+                pass
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                self.queue.task_done()
+                return
+            self._count('busy')
+            try:
+                result = self.handler(item)
+                if result is not None and self.next:
+                    self.next.put(result)
+                self._count('processed')
+            except Exception as e:
+                print(f"Pipeline stage {self.name} failed: {e}")
+                self._count('errors')
+            finally:
+                self._count('busy', -1)
+                self.queue.task_done()
+
+    def start(self):
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'{self.name}-{n}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Let queued items finish, then end the workers"""
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats['queued'] = self.queue.qsize()
+        stats['workers'] = self.workers
+        stats['policy'] = self.policy
+        return stats
+
+
+class Pipeline:
+    """Stages run in the order given; put() feeds the first one"""
+
+    def __init__(self, *stages):
+        self.stages = stages
+        for stage, following in zip(stages, stages[1:]):
+            stage.next = following
+
+    def put(self, item):
+        self.stages[0].put(item)
+
+    def start(self):
+        for stage in reversed(self.stages):
+            stage.start()
+
+    def stop(self):
+        # In order, so each stage's last results still reach a running next stage
+        for stage in self.stages:
+            stage.stop()
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
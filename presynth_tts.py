@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - TTS Pre-synthesis
+Synthesizes every canned hint reply into the TTS cache ahead of time
+
+Usage: python presynth_tts.py [workers]
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from web_clean import tts_cache, turns
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    if tts_cache.store.backend == 'memory':
+        raise SystemExit("TTS_CACHE_BACKEND=memory keeps audio inside the server; nothing to pre-synthesize")
+    if not tts_cache.backends:
+        raise SystemExit("No TTS backend available (set OPENAI_API_KEY or install espeak-ng)")
+
+    texts = list(dict.fromkeys(turns.canned_replies(turns.catalog.current)))
+    cached = sum(1 for text in texts if tts_cache.contains(tts_cache.audio_id(text)))
+
+    print(f"{len(texts)} canned replies, {cached} already cached, using {tts_cache.backends[0]}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        audio_ids = list(pool.map(tts_cache.synthesize, texts))
+
+    failed = [text for text, audio_id in zip(texts, audio_ids) if audio_id is None]
+    stats = tts_cache.stats()
+    print(f"Synthesized {stats['misses']} ({stats['bytes_synthesized'] / 1024:.0f} KB) "
+          f"in {time.perf_counter() - start:.1f}s; {stats['store']['files']} files in {tts_cache.store}")
+    for text in failed:
+        print(f"  failed: {text[:70]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Prompt Templates
+Catalog sections are rendered once at load; requests only fill in their own fields
+"""
+
+import json
+import os
+from string import Template
+
+from intent_router import puzzle_for_key
+
+# Puzzles sent with each chat prompt, on top of the session's current puzzle
+CHAT_TOP_K = int(os.getenv('CHAT_TOP_K', '5'))
+
+
+def render_puzzle_list(puzzles):
+    """One 'Room: ..., Puzzle: ...' line per puzzle"""
+    return '\n'.join(f"Room: {p.room}, Puzzle: {p.puzzle_name}" for p in puzzles)
+
+
+def render_puzzle_names(puzzles):
+    """Python-list rendering used by the short matcher prompts"""
+    return str([f"Room: {p.room}, Puzzle: {p.puzzle_name}" for p in puzzles])
+
+
+def render_catalog_json(puzzles):
+    """JSON catalog with descriptions and hints, as embedded in the chat prompts"""
+    puzzle_data = []
+    for p in puzzles:
+        puzzle_data.append({
+            'room': p.room,
+            'name': p.puzzle_name,
+            'description': p.physical_description,
+            'hints': list(p.hints)
+        })
+    return json.dumps(puzzle_data)
+
+
+def candidate_puzzles(snapshot, message, current_key=None, k=CHAT_TOP_K):
+    """The current puzzle plus the top-k local retrieval hits for a message
+
+    BM25 hits first; the fuzzy index only fills in when nothing matched
+    lexically (misheard or misspelled names).
+    """
+    current = puzzle_for_key(snapshot, current_key)
+    hits = snapshot.index.search(message, limit=k) or snapshot.fuzzy_index.search(message, limit=k)
+
+    candidates = [current] if current else []
+    for room, puzzle_name, _ in hits:
+        puzzle = snapshot.puzzles.get(room, puzzle_name)
+        if puzzle and puzzle is not current:
+            candidates.append(puzzle)
+    return candidates
+
+
+def estimate_tokens(text):
+    """Rough prompt token count (~4 characters per token) for logging"""
+    return len(text) // 4
+
+
+def render_fragments(puzzles):
+    """All catalog renderings, stored with the snapshot so prompts build without re-rendering"""
+    return {
+        'puzzle_list': render_puzzle_list(puzzles),
+        'puzzle_names': render_puzzle_names(puzzles),
+        'catalog_json': render_catalog_json(puzzles),
+    }
+
+
+class CompiledPrompt:
+    """A $-placeholder template with its static fields already substituted"""
+
+    def __init__(self, template, **static):
+        # Escape '$' in the static text so it survives the second substitution
+        escaped = {name: str(value).replace('$', '$$') for name, value in static.items()}
+        self.template = Template(Template(template).safe_substitute(escaped))
+
+        # Lines before the first per-request field are the same for every request
+        # of this snapshot, so they can be sent once as a cached context
+        lines = self.template.template.splitlines(keepends=True)
+        first = next((i for i, line in enumerate(lines) if self._has_field(line)), len(lines))
+        self.static_prefix = Template(''.join(lines[:first])).substitute()
+        self.dynamic = Template(''.join(lines[first:]))
+
+    def _has_field(self, line):
+        return any(m.group('named') or m.group('braced') for m in self.template.pattern.finditer(line))
+
+    def render(self, **fields):
+        """Fill in the per-request fields"""
+        return self.template.substitute(fields)
+
+    def render_parts(self, **fields):
+        """(static prefix, rest of the prompt); joined they equal render()"""
+        return self.static_prefix, self.dynamic.substitute(fields)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Local Puzzle Index
+BM25 keyword matcher used before falling back to Gemini
+"""
+
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+# Minimum BM25 score the top puzzle needs before we trust the local match
+DEFAULT_THRESHOLD = float(os.getenv('LOCAL_MATCH_THRESHOLD', '3.0'))
+
+# How far ahead of the runner-up the top puzzle must be (fraction of its score)
+DEFAULT_MARGIN = float(os.getenv('LOCAL_MATCH_MARGIN', '0.2'))
+
+# Field weights - names and keywords say more about a puzzle than its description
+FIELD_WEIGHTS = {
+    'puzzle_name': 3,
+    'keywords': 3,
+    'room': 2,
+    'physical_description': 1,
+}
+
+NUMBER_WORDS = {
+    'zero': '0', 'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5',
+    'six': '6', 'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10',
+    'first': '1', 'second': '2', 'third': '3', 'fourth': '4', 'fifth': '5',
+}
+
+STOP_WORDS = {
+    'a', 'about', 'am', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'but', 'by',
+    'can', 'do', 'does', 'for', 'from', 'get', 'give', 'got', 'have', 'how', 'i',
+    'im', 'in', 'is', 'it', 'its', 'just', 'me', 'my', 'need', 'of', 'on', 'or',
+    'please', 'so', 'some', 'tell', 'that', 'the', 'there', 'thing', 'this', 'to',
+    'up', 'we', 'were', 'what', 'with', 'you', 'your',
+    'help', 'hint', 'stuck', 'puzzle', 'working',
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_token(token):
+    """Map number words to digits and strip simple plurals"""
+    token = NUMBER_WORDS.get(token, token)
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Split text into normalized tokens, dropping stop words
+
+    "room 2" and "room two" collapse into a single "room2" token so the room
+    number is not confused with other numbers in the descriptions.
+    """
+    if not isinstance(text, str):
+        return []
+    text = text.lower().replace("'", '')
+    tokens = []
+    for token in TOKEN_RE.findall(text):
+        if token in STOP_WORDS:
+            continue
+        token = normalize_token(token)
+        if token.isdigit() and tokens and tokens[-1] == 'room':
+            tokens[-1] = f"room{token}"
+            continue
+        tokens.append(token)
+    return tokens
+
+
+class PuzzleIndex:
+    """Inverted index over the puzzle catalog scored with BM25"""
+
+    def __init__(self, puzzles, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.docs = []
+        self.doc_lengths = []
+        self.postings = defaultdict(list)
+
+        for puzzle in puzzles:
+            terms = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(getattr(puzzle, field)):
+                    terms[token] += weight
+            doc_id = len(self.docs)
+            self.docs.append((puzzle.room, puzzle.puzzle_name))
+            self.doc_lengths.append(sum(terms.values()))
+            for token, freq in terms.items():
+                self.postings[token].append((doc_id, freq))
+
+        total = len(self.docs)
+        avg_length = sum(self.doc_lengths) / total if total else 0.0
+        self.doc_norms = [
+            k1 * (1 - b + b * length / avg_length) if avg_length else k1
+            for length in self.doc_lengths
+        ]
+        self.idf = {
+            token: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for token, postings in self.postings.items()
+        }
+
+    def search(self, query, limit=5):
+        """Return a ranked list of (room, puzzle_name, score) for a query"""
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = self.idf[token]
+            for doc_id, freq in postings:
+                scores[doc_id] += idf * freq * (self.k1 + 1) / (freq + self.doc_norms[doc_id])
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(*self.docs[doc_id], score) for doc_id, score in ranked]
+
+    def best_match(self, query, threshold=DEFAULT_THRESHOLD, margin=DEFAULT_MARGIN):
+        """Return (room, puzzle_name) when the top hit is confident, else (None, None)"""
+        results = self.search(query, limit=2)
+        if not results:
+            return None, None
+
+        room, puzzle_name, score = results[0]
+        runner_up = results[1][2] if len(results) > 1 else 0.0
+        if score < threshold or score - runner_up < score * margin:
+            return None, None
+        return room, puzzle_name
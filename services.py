@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Shared Services
+Gemini, OpenAI and match cache clients created once per process and shared by every persona
+"""
+
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+from flask import session
+from openai import OpenAI
+
+from intent_router import IntentRouter
+from llm_client import LLMClient
+from match_cache import MatchCache
+from singleflight import SingleFlight
+from tts_backends import tts_backends_from_env
+from tts_cache import TTSCache
+from tts_worker import TTSWorker
+
+load_dotenv()
+
+GEMINI_MODEL = 'gemini-1.5-flash'
+
+# Browsers whose conversation state is kept; the least recently active are dropped first
+SESSION_LIMIT = int(os.getenv('SESSION_LIMIT', '1000'))
+
+_services = {}
+_services_lock = threading.RLock()  # get_llm() builds get_model() inside the lock
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def _shared(name, factory):
+    """Create a service on first use and hand out the same instance afterwards"""
+    with _services_lock:
+        if name not in _services:
+            _services[name] = factory()
+        return _services[name]
+
+
+def _create_model():
+    genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+
+def get_model():
+    """The process-wide Gemini model"""
+    return _shared('model', _create_model)
+
+
+def get_llm():
+    """The process-wide LLMClient (deadlines, retries, hedging) over get_model()"""
+    return _shared('llm', lambda: LLMClient(get_model()))
+
+
+def get_openai_client():
+    """The process-wide OpenAI client for TTS, or None without OPENAI_API_KEY"""
+    api_key = os.getenv('OPENAI_API_KEY')
+    return _shared('openai', lambda: OpenAI(api_key=api_key) if api_key else None)
+
+
+def get_tts_cache():
+    """The process-wide TTSCache over the TTS_BACKENDS that can run here"""
+    return _shared('tts_cache', lambda: TTSCache(tts_backends_from_env(get_openai_client())))
+
+
+def get_tts_worker():
+    """The process-wide background synthesis queue over get_tts_cache()"""
+    return _shared('tts_worker', lambda: TTSWorker(get_tts_cache()))
+
+
+def get_match_cache(catalog_path='puzzles.csv'):
+    """One MatchCache per catalog, so personas don't race each other writing match_cache.json"""
+    return _shared(f'match_cache:{catalog_path}', lambda: MatchCache(catalog_path))
+
+
+def get_intent_router():
+    """The process-wide IntentRouter, so its counters cover every persona"""
+    return _shared('router', IntentRouter)
+
+
+def get_single_flight(name):
+    """Process-wide SingleFlight for one kind of call ('match', 'chat')"""
+    return _shared(f'flight:{name}', SingleFlight)
+
+
+def single_flight_stats():
+    """Stats of every SingleFlight created so far, by name"""
+    with _services_lock:
+        flights = {name.split(':', 1)[1]: flight for name, flight in _services.items() if name.startswith('flight:')}
+    return {name: flight.stats() for name, flight in flights.items()}
+
+
+def persona_session(name):
+    """This persona's conversation state for the current browser
+
+    The state lives in process memory under a random id kept in the session
+    cookie, so a streamed reply can still update it after the response
+    headers (and cookie) have gone out. Personas keep separate state.
+    """
+    sid = session.get('sid')
+    if sid is None:
+        sid = session['sid'] = uuid.uuid4().hex
+    with _sessions_lock:
+        states = _sessions.pop(sid, None) or {}
+        _sessions[sid] = states
+        while len(_sessions) > SESSION_LIMIT:
+            _sessions.popitem(last=False)
+        return states.setdefault(name, {})
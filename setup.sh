@@ -16,6 +16,8 @@ source venv/bin/activate
 # Install dependencies
 echo "Installing dependencies..."
 pip install -r requirements.txt
+# Optional offline voice extras; the voice apps fall back to cloud services without them
+pip install -r requirements-voice.txt || echo "Optional voice extras not installed (see requirements-voice.txt)"
 
 # Check if pyaudio installation succeeded (common issue on macOS)
 python -c "import pyaudio" 2>/dev/null
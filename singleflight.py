@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Single Flight
+Concurrent requests with the same key share one upstream call (or stream)
+"""
+
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Stream:
+    __slots__ = ('chunks', 'done', 'error', 'listeners', 'cond')
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.listeners = 0
+        self.cond = threading.Condition()
+
+
+class SingleFlight:
+    """Runs fn once per key at a time; callers arriving meanwhile wait for that result"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.streams = {}
+        self.counters = {'calls': 0, 'executed': 0, 'coalesced': 0, 'errors': 0}
+
+    def do(self, key, fn):
+        """fn() for the first caller with this key, its result (or error) for the rest"""
+        with self.lock:
+            self.counters['calls'] += 1
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.counters['executed'] += 1
+            else:
+                self.counters['coalesced'] += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+                with self.lock:
+                    self.counters['errors'] += 1
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stream(self, key, fn):
+        """Chunks of fn() (an iterator) for the first caller with this key; the same chunks for the rest
+
+        A caller that joins late gets the chunks so far, then follows along.
+        fn() runs on its own thread and is closed once every caller has gone.
+        """
+        with self.lock:
+            self.counters['calls'] += 1
+            stream = self.streams.get(key)
+            if stream is None:
+                stream = self.streams[key] = _Stream()
+                self.counters['executed'] += 1
+                threading.Thread(target=self._pump, args=(key, stream, fn), name='stream-flight',
+                                 daemon=True).start()
+            else:
+                self.counters['coalesced'] += 1
+            stream.listeners += 1
+        return self._follow(stream)
+
+    def _pump(self, key, stream, fn):
+        chunks = None
+        try:
+            chunks = fn()
+            for chunk in chunks:
+                with stream.cond:
+                    stream.chunks.append(chunk)
+                    stream.cond.notify_all()
+                with self.lock:
+                    if not stream.listeners:
+                        break
+        except Exception as e:
+            stream.error = e
+            with self.lock:
+                self.counters['errors'] += 1
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            with self.lock:
+                del self.streams[key]
+            with stream.cond:
+                stream.done = True
+                stream.cond.notify_all()
+
+    def _follow(self, stream):
+        sent = 0
+        try:
+            while True:
+                with stream.cond:
+                    stream.cond.wait_for(lambda: len(stream.chunks) > sent or stream.done)
+                    chunks = stream.chunks[sent:]
+                    done = stream.done
+                yield from chunks
+                sent += len(chunks)
+                if done:
+                    if stream.error is not None:
+                        raise stream.error
+                    return
+        finally:
+            with self.lock:
+                stream.listeners -= 1
+
+    def stats(self):
+        """Counters plus how many keys are in flight right now"""
+        with self.lock:
+            stats = dict(self.counters)
+            stats['in_flight'] = len(self.calls) + len(self.streams)
+        stats['coalesce_rate'] = round(stats['coalesced'] / stats['calls'], 3) if stats['calls'] else 0.0
+        return stats
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Server-Sent Events
+Helpers for streaming chat replies to the page as they are generated
+"""
+
+import json
+
+from flask import Response
+
+
+def sse_event(event, data):
+    """One SSE frame; data is JSON-encoded so newlines in the text survive"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events):
+    """Stream an iterable of sse_event() frames without proxy buffering"""
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
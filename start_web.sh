@@ -5,4 +5,4 @@ echo "Press Ctrl+C to stop"
 echo ""
 
 source venv/bin/activate
-python web_app.py
\ No newline at end of file
+python web_server.py
\ No newline at end of file
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - TTS Backends
+Speech engines behind one interface: OpenAI, or a local espeak-ng/piper process
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+
+# Tried in this order; a backend that fails or times out is skipped for TTS_COOLDOWN seconds
+TTS_BACKENDS = os.getenv('TTS_BACKENDS', 'openai,local')
+TTS_TIMEOUT = float(os.getenv('TTS_TIMEOUT', '3'))
+TTS_COOLDOWN = float(os.getenv('TTS_COOLDOWN', '60'))
+
+TTS_MODEL = os.getenv('TTS_MODEL', 'tts-1')
+TTS_VOICE = os.getenv('TTS_VOICE', 'nova')  # alloy, echo, fable, onyx, nova, shimmer
+
+# espeak-ng, espeak or piper; for piper the voice is the path to its .onnx model
+LOCAL_TTS_COMMAND = os.getenv('LOCAL_TTS_COMMAND', 'espeak-ng')
+LOCAL_TTS_VOICE = os.getenv('LOCAL_TTS_VOICE', 'en-us')
+
+CHUNK_SIZE = 16 * 1024
+
+
+class OpenAITTS:
+    """OpenAI speech API, streamed as MP3"""
+
+    name = 'openai'
+    ext = 'mp3'
+    mimetype = 'audio/mpeg'
+
+    def __init__(self, client, model=TTS_MODEL, voice=TTS_VOICE, timeout=TTS_TIMEOUT):
+        self.client = client
+        self.model = model
+        self.voice = voice
+        self.timeout = timeout
+        # Same key format as before backends existed, so cached OpenAI audio keeps its ids
+        self.key = f"{model}\0{voice}"
+
+    def stream(self, text):
+        """MP3 chunks for text; raises if nothing arrives within the timeout"""
+        with self.client.audio.speech.with_streaming_response.create(
+                model=self.model, voice=self.voice, input=text, timeout=self.timeout) as response:
+            yield from response.iter_bytes(CHUNK_SIZE)
+
+    def __str__(self):
+        return f"openai ({self.model}, {self.voice})"
+
+
+class LocalTTS:
+    """An espeak-ng or piper subprocess: no network, WAV output"""
+
+    name = 'local'
+    ext = 'wav'
+    mimetype = 'audio/wav'
+
+    def __init__(self, command=LOCAL_TTS_COMMAND, voice=LOCAL_TTS_VOICE, timeout=TTS_TIMEOUT):
+        self.command = command
+        self.voice = voice
+        self.timeout = timeout
+        self.key = f"local\0{command}\0{voice}"
+
+    def _argv(self):
+        if os.path.basename(self.command).startswith('piper'):
+            return [self.command, '--model', self.voice, '--output_file', '/dev/stdout']
+        return [self.command, '-v', self.voice, '--stdout']
+
+    def stream(self, text):
+        """WAV chunks for text, read from the engine's stdout as it writes them
+
+        The engine is killed if it goes silent for the timeout, however long it runs in total.
+        """
+        process = subprocess.Popen(self._argv(), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL)
+        watchdog = threading.Timer(self.timeout, process.kill)
+        watchdog.start()
+        try:
+            process.stdin.write(text.encode('utf-8'))
+            process.stdin.close()
+            # read1 returns whatever is available, so each chunk re-arms the watchdog
+            for chunk in iter(lambda: process.stdout.read1(CHUNK_SIZE), b''):
+                watchdog.cancel()
+                watchdog = threading.Timer(self.timeout, process.kill)
+                watchdog.start()
+                yield chunk
+            if process.wait() != 0:
+                raise RuntimeError(f"{self.command} exited with status {process.returncode}")
+        finally:
+            watchdog.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+    def __str__(self):
+        return f"local ({self.command}, {self.voice})"
+
+
+def tts_backends_from_env(openai_client):
+    """The backends named in TTS_BACKENDS that can run here, in failover order"""
+    backends = []
+    for name in TTS_BACKENDS.split(','):
+        name = name.strip()
+        if name == 'openai' and openai_client:
+            backends.append(OpenAITTS(openai_client))
+        elif name == 'local' and shutil.which(LOCAL_TTS_COMMAND):
+            backends.append(LocalTTS())
+    return backends
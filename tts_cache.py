@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - TTS Cache
+Content-addressed store of synthesized speech, keyed by (text, voice, model)
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from audio_store import audio_store_from_env
+from singleflight import SingleFlight
+from tts_backends import TTS_COOLDOWN
+
+AUDIO_ID_RE = re.compile(r'[0-9a-f]{64}')
+
+# A listener gives up when a synthesis produces nothing for this long
+STALL_TIMEOUT = 30
+# Requested ids remembered after a fallback backend answered under its own id
+ALIAS_LIMIT = 1000
+
+
+class _Partial:
+    """Audio being synthesized: the chunks so far, and whether it is finished"""
+
+    def __init__(self):
+        self.chunks = []
+        self.mimetype = None
+        self.done = False
+        self.failed = False
+        self.cond = threading.Condition()
+
+    def append(self, chunk, mimetype):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.mimetype = mimetype
+            self.cond.notify_all()
+
+    def finish(self, failed=False):
+        with self.cond:
+            self.done = True
+            self.failed = failed
+            self.cond.notify_all()
+
+
+class TTSCache:
+    """Speech stored under the SHA-256 of what produced it (see audio_store.py for where)
+
+    backends are tried in order (see tts_backends.py); one that fails before
+    sending any audio is skipped for TTS_COOLDOWN seconds.
+    """
+
+    def __init__(self, backends, store=None, cooldown=TTS_COOLDOWN):
+        self.backends = list(backends)
+        self.store = store if store is not None else audio_store_from_env()
+        self.cooldown = cooldown
+        self.down_until = {}
+        self.aliases = OrderedDict()
+        self.flight = SingleFlight()
+        self.partials = {}
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'errors': 0, 'failovers': 0,
+                         'bytes_saved': 0, 'bytes_synthesized': 0}
+        for backend in self.backends:
+            self.counters[f'{backend.name}_synthesized'] = 0
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def audio_id(self, text, backend=None):
+        """Cache key for text as spoken by backend (the first one by default)
+
+        None when there is no backend, since nothing can have been synthesized.
+        """
+        backend = backend or (self.backends[0] if self.backends else None)
+        if backend is None:
+            return None
+        return hashlib.sha256(f"{backend.key}\0{text}".encode('utf-8')).hexdigest()
+
+    def _resolve(self, audio_id):
+        with self.lock:
+            return self.aliases.get(audio_id, audio_id)
+
+    def contains(self, audio_id):
+        """Whether audio_id is a well-formed id that is stored"""
+        return bool(audio_id and AUDIO_ID_RE.fullmatch(audio_id)) and self.store.contains(self._resolve(audio_id))
+
+    def source(self, audio_id):
+        """(source, mimetype) for stored audio, source being something send_file can serve
+
+        None if the id is malformed or not stored.
+        """
+        if not AUDIO_ID_RE.fullmatch(audio_id):
+            return None
+        audio_id = self._resolve(audio_id)
+        source = self.store.source(audio_id)
+        return (source, self.store.mimetype(audio_id)) if source else None
+
+    def lookup(self, text):
+        """Audio id for text if any backend's version is already cached, otherwise None"""
+        for backend in self.backends:
+            audio_id = self.audio_id(text, backend)
+            size = self.store.size(audio_id)
+            if size is not None:
+                self._count('hits')
+                self._count('bytes_saved', size)
+                return audio_id
+        return None
+
+    def synthesize(self, text):
+        """Audio id for text, calling a backend only when it isn't cached yet"""
+        cached = self.lookup(text)
+        if cached:
+            return cached
+        if not self.backends:
+            return None
+        audio_id = self.audio_id(text)
+        # Several players hearing the same hint at once trigger one synthesis
+        return self.flight.do(audio_id, lambda: self._synthesize(text, audio_id))
+
+    def expect(self, audio_id):
+        """Register audio_id as on its way so stream() waits for it instead of giving up"""
+        with self.lock:
+            partial = self.partials.get(audio_id)
+            if partial is None:
+                partial = self.partials[audio_id] = _Partial()
+            return partial
+
+    def release(self, audio_id, failed=False):
+        """Wake anyone following audio_id; called once it is stored or won't be"""
+        with self.lock:
+            partial = self.partials.pop(audio_id, None)
+        if partial:
+            partial.finish(failed)
+
+    def _candidates(self):
+        """Backends not cooling down after a failure, or all of them if every one is"""
+        now = time.time()
+        with self.lock:
+            healthy = [b for b in self.backends if self.down_until.get(b.name, 0) <= now]
+        return healthy or self.backends
+
+    def _synthesize(self, text, audio_id):
+        partial = self.expect(audio_id)
+        failed = True
+        try:
+            for backend in self._candidates():
+                try:
+                    # Chunks reach listeners as they arrive and are stored once complete
+                    for chunk in backend.stream(text):
+                        partial.append(chunk, backend.mimetype)
+                    break
+                except Exception as e:
+                    print(f"TTS Error ({backend}): {e}")
+                    with self.lock:
+                        self.down_until[backend.name] = time.time() + self.cooldown
+                    if partial.chunks:
+                        # Listeners already have part of this backend's audio; can't splice another's
+                        raise
+                    self._count('failovers')
+            else:
+                raise RuntimeError("every TTS backend failed")
+
+            data = b''.join(partial.chunks)
+            stored_id = self.audio_id(text, backend)
+            self.store.put(stored_id, data, backend.ext)
+            failed = False
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            self._count('errors')
+            return None
+        finally:
+            self.release(audio_id, failed)
+
+        if stored_id != audio_id:
+            with self.lock:
+                self.aliases[audio_id] = stored_id
+                if len(self.aliases) > ALIAS_LIMIT:
+                    self.aliases.popitem(last=False)
+        self._count('misses')
+        self._count(f'{backend.name}_synthesized')
+        self._count('bytes_synthesized', len(data))
+        return stored_id
+
+    def stream(self, audio_id):
+        """(mimetype, chunks) for audio_id, following it while it is synthesized; None if unavailable
+
+        Waits for the first chunk, which says what format the audio is in.
+        The chunks raise if synthesis then fails or stalls, so a response
+        relaying them is cut off rather than ending as a complete, truncated file.
+        """
+        with self.lock:
+            partial = self.partials.get(audio_id)
+        if partial is None:
+            audio_id = self._resolve(audio_id)
+            f = self.store.open(audio_id)
+            if not f:
+                return None
+            return self.store.mimetype(audio_id), self._read(f)
+
+        with partial.cond:
+            if not partial.cond.wait_for(lambda: partial.chunks or partial.done, STALL_TIMEOUT):
+                return None
+            if not partial.chunks:
+                return None
+            mimetype = partial.mimetype
+        return mimetype, self._follow(partial)
+
+    @staticmethod
+    def _read(f):
+        with f:
+            yield from iter(lambda: f.read(16 * 1024), b'')
+
+    @staticmethod
+    def _follow(partial):
+        sent = 0
+        while True:
+            with partial.cond:
+                while len(partial.chunks) <= sent and not partial.done:
+                    if not partial.cond.wait(STALL_TIMEOUT):
+                        raise RuntimeError("TTS synthesis stalled")
+                chunks = partial.chunks[sent:]
+                done = partial.done
+            yield from chunks
+            sent += len(chunks)
+            if done and not chunks:
+                if partial.failed:
+                    raise RuntimeError("TTS synthesis failed partway through")
+                return
+
+    def stats(self):
+        """Hit/miss counters and bytes served from cache, plus the store's size and evictions"""
+        with self.lock:
+            stats = dict(self.counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['backends'] = [str(backend) for backend in self.backends]
+        stats['store'] = self.store.stats()
+        return stats
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - TTS Worker
+Synthesizes speech on a small thread pool so text replies never wait on it
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+TTS_WORKERS = int(os.getenv('TTS_WORKERS', '2'))
+# Syntheses queued or running at once; beyond this the browser speaks the reply itself
+TTS_QUEUE_LIMIT = int(os.getenv('TTS_QUEUE_LIMIT', '16'))
+# Seconds the page waits for audio to start playing before speaking the reply itself
+TTS_WAIT = float(os.getenv('TTS_WAIT', '4'))
+
+READY = 'ready'
+PENDING = 'pending'
+MISSING = 'missing'
+
+
+class TTSWorker:
+    """Bounded background queue in front of a TTSCache"""
+
+    def __init__(self, cache, workers=TTS_WORKERS, queue_limit=TTS_QUEUE_LIMIT):
+        self.cache = cache
+        self.queue_limit = queue_limit
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tts')
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.counters = {'submitted': 0, 'cached': 0, 'rejected': 0, 'completed': 0, 'failed': 0}
+
+    def submit(self, text):
+        """(audio_id, status) right away; a pending id becomes ready once synthesized
+
+        Returns (None, MISSING) when no TTS backend is available or the queue is full.
+        """
+        audio_id = self.cache.lookup(text)
+        if audio_id:
+            with self.lock:
+                self.counters['cached'] += 1
+            return audio_id, READY
+        if not self.cache.backends:
+            return None, MISSING
+
+        audio_id = self.cache.audio_id(text)
+        with self.lock:
+            if audio_id not in self.jobs:
+                if len(self.jobs) >= self.queue_limit:
+                    self.counters['rejected'] += 1
+                    return None, MISSING
+                self.cache.expect(audio_id)
+                self.jobs[audio_id] = self.executor.submit(self._run, text, audio_id)
+                self.counters['submitted'] += 1
+        return audio_id, PENDING
+
+    def _run(self, text, audio_id):
+        try:
+            result = self.cache.synthesize(text)
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            result = None
+        # Already done unless it was cached by someone else before this job started
+        self.cache.release(audio_id)
+        with self.lock:
+            del self.jobs[audio_id]
+            self.counters['completed' if result else 'failed'] += 1
+        return result
+
+    def status(self, audio_id):
+        """READY, PENDING, or MISSING (failed, evicted or never requested)"""
+        # Jobs before the store: a job leaves self.jobs only after its audio is stored
+        with self.lock:
+            if audio_id in self.jobs:
+                return PENDING
+        return READY if self.cache.contains(audio_id) else MISSING
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats['queued'] = len(self.jobs)
+        return stats
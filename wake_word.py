@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Wake Word Spotter
+Listens for the wake and shutdown phrases on the raw microphone stream, offline on CPU
+"""
+
+import os
+import tempfile
+
+from pocketsphinx import Decoder
+
+# The spotter expects 16 kHz, 16-bit mono PCM
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+CHUNK = 1024
+
+# Detection threshold per phrase: higher (e.g. 1e-10) rejects more chatter, lower
+# (e.g. 1e-30) misses fewer quiet wake words. Short phrases need higher values.
+WAKE_WORD_THRESHOLD = float(os.getenv('WAKE_WORD_THRESHOLD', '1e-20'))
+
+
+class WakeWordSpotter:
+    """PocketSphinx keyword search over a fixed list of phrases"""
+
+    def __init__(self, phrases, threshold=WAKE_WORD_THRESHOLD):
+        self.phrases = [phrase.lower() for phrase in phrases]
+        # Each phrase goes on its own line of a keyword list file: "phrase /threshold/"
+        with tempfile.NamedTemporaryFile('w', suffix='.kws', delete=False) as f:
+            for phrase in self.phrases:
+                f.write(f"{phrase} /{threshold:g}/\n")
+            self.keyword_file = f.name
+        try:
+            self.decoder = Decoder(kws=self.keyword_file, samprate=SAMPLE_RATE, logfn=os.devnull)
+        finally:
+            os.remove(self.keyword_file)
+        self.decoder.start_utt()
+
+    def feed(self, chunk):
+        """Process PCM bytes; the phrase heard in them, or None"""
+        self.decoder.process_raw(chunk, False, False)
+        hypothesis = self.decoder.hyp()
+        if hypothesis is None:
+            return None
+        self.reset()
+        # A chunk can complete more than one phrase; the last is the most recent
+        heard = hypothesis.hypstr.strip()
+        return next((phrase for phrase in self.phrases if heard.endswith(phrase)), heard)
+
+    def reset(self):
+        """Forget partial matches, e.g. after the microphone was used for something else"""
+        self.decoder.end_utt()
+        self.decoder.start_utt()
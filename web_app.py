@@ -4,93 +4,100 @@ EscapeRoom Assistant - Web Application
 Web interface with voice recognition
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Blueprint, Flask, render_template, request, jsonify
 import os
-import pandas as pd
-import google.generativeai as genai
-from dotenv import load_dotenv
 import json
 import re
+from catalog import get_catalog
+from prompts import CompiledPrompt
+from match_cache import canonical_query
+from services import get_llm, get_match_cache, get_single_flight
 
-app = Flask(__name__)
+bp = Blueprint('lookup', __name__)
+
+MATCH_PROMPT = """
+        Available puzzles:
+        $puzzles
+        
+        User query: "$user_query"
+        
+        Match this user query to the closest puzzle from the list above. 
+        Return ONLY a JSON object with exactly these fields:
+        {"room": "exact room name", "puzzle_name": "exact puzzle name"}
+        """
+
+def build_match_prompt(snapshot):
+    return CompiledPrompt(MATCH_PROMPT, puzzles=snapshot.fragments['puzzle_list'])
 
 class EscapeRoomWeb:
     def __init__(self):
-        load_dotenv()
         self.api_key = os.getenv('GOOGLE_API_KEY')
         if not self.api_key:
             raise ValueError("GOOGLE_API_KEY not found in .env file")
         
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-        self.puzzles_df = self.load_puzzles()
+        self.llm = get_llm()
+        self.catalog = self.load_puzzles()
+        self.match_cache = get_match_cache('puzzles.csv')
+        self.match_flight = get_single_flight('match')
     
     def load_puzzles(self):
-        try:
-            return pd.read_csv('puzzles.csv')
-        except FileNotFoundError:
-            raise FileNotFoundError("puzzles.csv not found")
+        catalog = get_catalog('puzzles.csv')
+        catalog.register(build_match_prompt)
+        return catalog
     
     def match_puzzle_with_gemini(self, user_query):
-        puzzle_list = []
-        for _, row in self.puzzles_df.iterrows():
-            puzzle_list.append(f"Room: {row['room']}, Puzzle: {row['puzzle_name']}")
+        snapshot = self.catalog.current
         
-        prompt = f"""
-        Available puzzles:
-        {chr(10).join(puzzle_list)}
+        # Resolve locally when the keyword index is confident
+        room, puzzle_name = snapshot.index.best_match(user_query)
+        if room:
+            return room, puzzle_name
         
-        User query: "{user_query}"
+        cached = self.match_cache.get(user_query)
+        if cached:
+            return cached
         
-        Match this user query to the closest puzzle from the list above. 
-        Return ONLY a JSON object with exactly these fields:
-        {{"room": "exact room name", "puzzle_name": "exact puzzle name"}}
-        """
+        # Teammates asking the same thing at once share one Gemini call
+        key = (snapshot.fingerprint, canonical_query(user_query) or user_query.strip().lower())
+        return self.match_flight.do(key, lambda: self.ask_gemini(snapshot, user_query))
+    
+    def ask_gemini(self, snapshot, user_query):
+        # The catalog part can be served from a Gemini context cache
+        prefix, prompt = snapshot.get(build_match_prompt).render_parts(user_query=user_query)
         
         try:
-            response = self.model.generate_content(prompt)
-            json_match = re.search(r'\{.*\}', response.text.strip(), re.DOTALL)
+            response_text = self.llm.generate_sync(prompt, prefix=prefix)
+            json_match = re.search(r'\{.*\}', response_text.strip(), re.DOTALL)
             if json_match:
                 result = json.loads(json_match.group())
-                return result.get('room'), result.get('puzzle_name')
+                room, puzzle_name = result.get('room'), result.get('puzzle_name')
+                if self.get_puzzle_hints(room, puzzle_name):
+                    self.match_cache.put(user_query, room, puzzle_name)
+                return room, puzzle_name
             return None, None
         except Exception as e:
             print(f"Gemini API error: {e}")
             return None, None
     
     def get_puzzle_hints(self, room, puzzle_name):
-        try:
-            puzzle = self.puzzles_df[
-                (self.puzzles_df['room'] == room) & 
-                (self.puzzles_df['puzzle_name'] == puzzle_name)
-            ]
-            
-            if puzzle.empty:
-                return None
-            
-            puzzle_row = puzzle.iloc[0]
-            hints = []
-            for i in range(1, 5):
-                hint = puzzle_row.get(f'hint{i}')
-                if pd.notna(hint) and hint.strip():
-                    hints.append(hint)
-            
-            return {
-                'room': puzzle_row['room'],
-                'puzzle_name': puzzle_row['puzzle_name'],
-                'description': puzzle_row.get('physical_description', ''),
-                'hints': hints
-            }
-        except Exception:
+        puzzle = self.catalog.current.puzzles.get(room, puzzle_name)
+        if puzzle is None:
             return None
+        
+        return {
+            'room': puzzle.room,
+            'puzzle_name': puzzle.puzzle_name,
+            'description': puzzle.physical_description,
+            'hints': list(puzzle.hints)
+        }
 
 assistant = EscapeRoomWeb()
 
-@app.route('/')
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/api/query', methods=['POST'])
+@bp.route('/api/query', methods=['POST'])
 def process_query():
     data = request.json
     user_query = data.get('query', '')
@@ -110,16 +117,23 @@ def process_query():
     
     return jsonify(puzzle_info)
 
-@app.route('/api/puzzles')
+@bp.route('/api/cache/stats')
+def cache_stats():
+    return jsonify(assistant.match_cache.stats())
+
+@bp.route('/api/puzzles')
 def get_all_puzzles():
     puzzles = []
-    for _, row in assistant.puzzles_df.iterrows():
+    for puzzle in assistant.catalog.current.puzzles:
         puzzles.append({
-            'room': row['room'],
-            'puzzle_name': row['puzzle_name'],
-            'description': row.get('physical_description', '')
+            'room': puzzle.room,
+            'puzzle_name': puzzle.puzzle_name,
+            'description': puzzle.physical_description
         })
     return jsonify(puzzles)
 
+app = Flask(__name__)
+app.register_blueprint(bp)
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -1,18 +1,10 @@
-from flask import Flask, request, jsonify, session
-import pandas as pd
-import google.generativeai as genai
-from dotenv import load_dotenv
-import json, re, os
+from flask import Blueprint, Flask
+import re
+from chat_turns import ChatTurns
 
-load_dotenv()
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-model = genai.GenerativeModel('gemini-1.5-flash')
-df = pd.read_csv('puzzles.csv')
+bp = Blueprint('friendly', __name__)
 
-app = Flask(__name__)
-app.secret_key = 'escape_room_chat'
-
-@app.route('/')
+@bp.route('/')
 def index():
     return '''
 <!DOCTYPE html>
@@ -56,6 +48,7 @@ def index():
         <div id="voiceStatus" style="text-align: center; margin-top: 10px; font-size: 12px; color: #666;"></div>
     </div>
 
+    <script src="chat_stream.js"></script>
     <script>
         function sendMessage() {
             const input = document.getElementById('messageInput');
@@ -68,15 +61,22 @@ def index():
             // Show typing indicator
             const typingDiv = addMessage('Thinking...', 'assistant typing');
             
-            fetch('/api/chat', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: message })
-            })
-            .then(response => response.json())
-            .then(data => {
-                typingDiv.remove();
-                addMessage(data.response, 'assistant');
+            let replyDiv = null;
+            
+            streamChat(message, {
+                token: text => {
+                    if (!replyDiv) {
+                        typingDiv.remove();
+                        replyDiv = addMessage('', 'assistant');
+                    }
+                    replyDiv.textContent += text;
+                    document.getElementById('chatContainer').scrollTop = document.getElementById('chatContainer').scrollHeight;
+                },
+                done: data => {
+                    typingDiv.remove();
+                    if (!replyDiv) replyDiv = addMessage('', 'assistant');
+                    replyDiv.textContent = data.response;
+                }
             })
             .catch(error => {
                 typingDiv.remove();
@@ -95,7 +95,7 @@ def index():
         }
         
         function clearChat() {
-            fetch('/api/clear', { method: 'POST' });
+            fetch('api/clear', { method: 'POST' });
             document.getElementById('chatContainer').innerHTML = 
                 '<div class="message assistant-message">Hey there! I\\'m your escape room buddy. What puzzle are you working on? Tell me what\\'s going on and I\\'ll help you figure it out! 😊</div>';
         }
@@ -160,44 +160,18 @@ def index():
 </html>
     '''
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    message = request.json.get('message', '')
-    
-    if 'conversation' not in session:
-        session['conversation'] = []
-    if 'current_puzzle' not in session:
-        session['current_puzzle'] = None
-    if 'hint_count' not in session:
-        session['hint_count'] = 0
-    
-    conversation = session['conversation']
-    
-    # Build context for Gemini
-    puzzle_data = []
-    for _, row in df.iterrows():
-        hints = [row.get(f'hint{i}') for i in range(1, 5) if pd.notna(row.get(f'hint{i}'))]
-        puzzle_data.append({
-            'room': row['room'],
-            'name': row['puzzle_name'],
-            'description': row.get('physical_description', ''),
-            'hints': hints
-        })
-    
-    history = "\\n".join([f"User: {c['user']}\\nYou: {c['assistant']}" for c in conversation[-5:]])
-    
-    prompt = f"""
+CHAT_PROMPT = """
     You are a friendly, conversational escape room assistant. Be natural, helpful, and engaging.
     
-    Available puzzles: {json.dumps(puzzle_data)}
+    Most relevant puzzles: $catalog
     
-    Current puzzle context: {session.get('current_puzzle')}
-    Hints given so far: {session.get('hint_count', 0)}
+    Current puzzle context: $current_puzzle
+    Hints given so far: $hint_count
     
     Recent conversation:
-    {history}
+    $history
     
-    User just said: "{message}"
+    User just said: "$message"
     
     Instructions:
     - Be conversational and friendly, not robotic
@@ -209,52 +183,20 @@ def chat():
     
     Respond naturally as a helpful friend would.
     """
-    
-    try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Try to detect if we're talking about a specific puzzle
-        for _, row in df.iterrows():
-            puzzle_name = row['puzzle_name'].lower()
-            room_name = row['room'].lower()
-            
-            if any(word in message.lower() for word in puzzle_name.split()) or room_name in message.lower():
-                puzzle_key = f"{row['room']}_{row['puzzle_name']}"
-                
-                if session.get('current_puzzle') != puzzle_key:
-                    session['current_puzzle'] = puzzle_key
-                    session['hint_count'] = 0
-                
-                # Get next hint if they're asking for help
-                if any(word in message.lower() for word in ['help', 'hint', 'stuck', 'how', 'what']):
-                    hints = [row.get(f'hint{i}') for i in range(1, 5) if pd.notna(row.get(f'hint{i}'))]
-                    
-                    if session['hint_count'] < len(hints):
-                        hint = hints[session['hint_count']]
-                        session['hint_count'] += 1
-                        
-                        response_text = f"Ah, the {row['puzzle_name']}! Here's what I'd try: {hint}"
-                        
-                        if session['hint_count'] < len(hints):
-                            response_text += " Let me know if you need another hint!"
-                        else:
-                            response_text += " That's all the hints I have - you've got this!"
-                break
-        
-        # Update conversation
-        conversation.append({'user': message, 'assistant': response_text})
-        session['conversation'] = conversation[-10:]
-        
-        return jsonify({'response': response_text})
-        
-    except Exception as e:
-        return jsonify({'response': 'Sorry, I had a brain freeze there! What were you saying about the puzzle?'})
 
-@app.route('/api/clear', methods=['POST'])
-def clear():
-    session.clear()
-    return jsonify({'status': 'cleared'})
+turns = ChatTurns(
+    bp.name, CHAT_PROMPT,
+    hint_format="Ah, the {puzzle}! Here's what I'd try: {hint}",
+    more_hints=" Let me know if you need another hint!",
+    last_hint=" That's all the hints I have - you've got this!",
+    small_talk_reply="Anytime! 😊 Tell me which puzzle you're on and I'll help you crack it.",
+    error_reply='Sorry, I had a brain freeze there! What were you saying about the puzzle?'
+)
+turns.add_routes(bp)
+
+app = Flask(__name__)
+app.secret_key = 'escape_room_chat'
+app.register_blueprint(bp)
 
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=5006)
\ No newline at end of file
@@ -1,24 +1,17 @@
-from flask import Flask, request, jsonify, session, send_file
-import pandas as pd
-import google.generativeai as genai
-from dotenv import load_dotenv
-import json, re, os
-from openai import OpenAI
-import tempfile
-import uuid
+from flask import Blueprint, Flask, Response, jsonify, send_file
+import re
+from chat_turns import ChatTurns
+from services import get_tts_cache, get_tts_worker
+from tts_worker import MISSING, TTS_WAIT
 
-load_dotenv()
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-model = genai.GenerativeModel('gemini-1.5-flash')
-df = pd.read_csv('puzzles.csv')
+# TTS (OpenAI, or a local engine as fallback) behind a content-addressed cache, synthesized
+# in the background; see presynth_tts.py
+tts_cache = get_tts_cache()
+tts_worker = get_tts_worker()
 
-# OpenAI client for TTS
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY')) if os.getenv('OPENAI_API_KEY') else None
+bp = Blueprint('plain', __name__)
 
-app = Flask(__name__)
-app.secret_key = 'escape_room_chat'
-
-@app.route('/')
+@bp.route('/')
 def index():
     return '''
 <!DOCTYPE html>
@@ -174,6 +167,7 @@ def index():
         <div class="status" id="status"></div>
     </div>
 
+    <script src="chat_stream.js"></script>
     <script>
         function sendMessage() {
             const input = document.getElementById('messageInput');
@@ -185,19 +179,27 @@ def index():
             
             const typingDiv = addMessage('Thinking...', 'assistant typing');
             
-            fetch('/api/chat', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: message })
-            })
-            .then(response => response.json())
-            .then(data => {
-                typingDiv.remove();
-                addMessage(data.response, 'assistant');
-                if (speechEnabled && data.audio_id) {
-                    playAudio(data.audio_id);
-                } else if (speechEnabled) {
-                    speakText(data.response);
+            let replyDiv = null;
+            
+            streamChat(message, {
+                token: text => {
+                    if (!replyDiv) {
+                        typingDiv.remove();
+                        replyDiv = addMessage('', 'assistant');
+                    }
+                    replyDiv.textContent += text;
+                    document.getElementById('chatArea').scrollTop = document.getElementById('chatArea').scrollHeight;
+                },
+                done: data => {
+                    typingDiv.remove();
+                    if (!replyDiv) replyDiv = addMessage('', 'assistant');
+                    replyDiv.textContent = data.response;
+                    // Pending audio streams while it is synthesized, so play it right away too
+                    if (speechEnabled && data.audio_id) {
+                        playAudio(data.audio_id, data.response, data.audio_wait);
+                    } else if (speechEnabled) {
+                        speakText(data.response);
+                    }
                 }
             })
             .catch(error => {
@@ -217,7 +219,7 @@ def index():
         }
         
         function clearChat() {
-            fetch('/api/clear', { method: 'POST' });
+            fetch('api/clear', { method: 'POST' });
             document.getElementById('chatArea').innerHTML = 
                 '<div class="message assistant-message">Hi! I\\'m here to help you with escape room puzzles. Tell me what you\\'re working on and I\\'ll give you hints one at a time.</div>';
             synth.cancel();
@@ -272,8 +274,22 @@ def index():
             }
         }
         
-        function playAudio(audioId) {
-            const audio = new Audio(`/api/audio/${audioId}`);
+        function playAudio(audioId, fallbackText, waitSeconds) {
+            const audio = new Audio(`api/audio/${audioId}`);
+            let fellBack = false;
+            // Synthesis failed, or is queued or slow: speak the reply with the browser's voice instead
+            const fallBack = () => {
+                clearTimeout(timer);
+                if (fellBack) return;
+                fellBack = true;
+                audio.pause();
+                audio.removeAttribute('src');
+                audio.load();
+                speakText(fallbackText);
+            };
+            const timer = setTimeout(fallBack, (waitSeconds || 4) * 1000);
+            audio.onplaying = () => clearTimeout(timer);
+            audio.onerror = fallBack;
             audio.play().catch(e => console.log('Audio play failed:', e));
         }
         
@@ -308,116 +324,69 @@ def index():
 </html>
     '''
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    message = request.json.get('message', '')
-    
-    if 'conversation' not in session:
-        session['conversation'] = []
-    if 'current_puzzle' not in session:
-        session['current_puzzle'] = None
-    if 'hint_count' not in session:
-        session['hint_count'] = 0
-    
-    conversation = session['conversation']
-    
-    puzzle_data = []
-    for _, row in df.iterrows():
-        hints = [row.get(f'hint{i}') for i in range(1, 5) if pd.notna(row.get(f'hint{i}'))]
-        puzzle_data.append({
-            'room': row['room'],
-            'name': row['puzzle_name'],
-            'description': row.get('physical_description', ''),
-            'hints': hints
-        })
-    
-    history = "\\n".join([f"User: {c['user']}\\nYou: {c['assistant']}" for c in conversation[-5:]])
-    
-    prompt = f"""
+CHAT_PROMPT = """
     You are a helpful escape room assistant. Be conversational and friendly.
     
-    Available puzzles: {json.dumps(puzzle_data)}
+    Most relevant puzzles: $catalog
     
-    Current puzzle: {session.get('current_puzzle')}
-    Hints given: {session.get('hint_count', 0)}
+    Current puzzle: $current_puzzle
+    Hints given: $hint_count
     
     Recent conversation:
-    {history}
+    $history
     
-    User: "{message}"
+    User: "$message"
     
     If they mention a puzzle, give ONE relevant hint. If they ask for more help on the same puzzle, give the NEXT hint.
     Be helpful and encouraging.
     """
-    
-    try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        for _, row in df.iterrows():
-            puzzle_name = row['puzzle_name'].lower()
-            room_name = row['room'].lower()
-            
-            if any(word in message.lower() for word in puzzle_name.split()) or room_name in message.lower():
-                puzzle_key = f"{row['room']}_{row['puzzle_name']}"
-                
-                if session.get('current_puzzle') != puzzle_key:
-                    session['current_puzzle'] = puzzle_key
-                    session['hint_count'] = 0
-                
-                if any(word in message.lower() for word in ['help', 'hint', 'stuck', 'how', 'what']):
-                    hints = [row.get(f'hint{i}') for i in range(1, 5) if pd.notna(row.get(f'hint{i}'))]
-                    
-                    if session['hint_count'] < len(hints):
-                        hint = hints[session['hint_count']]
-                        session['hint_count'] += 1
-                        
-                        response_text = f"For the {row['puzzle_name']}: {hint}"
-                        
-                        if session['hint_count'] < len(hints):
-                            response_text += " Need another hint? Just ask!"
-                        else:
-                            response_text += " That's all the hints I have for this one!"
-                break
-        
-        conversation.append({'user': message, 'assistant': response_text})
-        session['conversation'] = conversation[-10:]
-        
-        return jsonify({'response': response_text, 'audio_id': generate_audio(response_text)})
-        
-    except Exception as e:
-        return jsonify({'response': 'Sorry, I had trouble with that. Can you try rephrasing?'})
 
-def generate_audio(text):
-    if not openai_client:
-        return None
-    
-    try:
-        audio_id = str(uuid.uuid4())
-        response = openai_client.audio.speech.create(
-            model="tts-1",
-            voice="nova",  # Female voice, options: alloy, echo, fable, onyx, nova, shimmer
-            input=text
-        )
-        
-        audio_path = f"/tmp/audio_{audio_id}.mp3"
-        response.stream_to_file(audio_path)
-        return audio_id
-    except Exception as e:
-        print(f"TTS Error: {e}")
-        return None
+turns = ChatTurns(
+    bp.name, CHAT_PROMPT,
+    hint_format="For the {puzzle}: {hint}",
+    more_hints=" Need another hint? Just ask!",
+    last_hint=" That's all the hints I have for this one!",
+    small_talk_reply="Happy to help! Tell me which puzzle you're working on and I'll give you a hint.",
+    error_reply='Sorry, I had trouble with that. Can you try rephrasing?'
+)
 
-@app.route('/api/audio/<audio_id>')
+def audio_fields(response_text):
+    """audio_id/audio_status for a reply, without waiting; canned hints are usually already cached"""
+    audio_id, audio_status = tts_worker.submit(response_text)
+    return {'audio_id': audio_id, 'audio_status': audio_status, 'audio_wait': TTS_WAIT}
+
+turns.add_routes(bp, extra=audio_fields)
+
+@bp.route('/api/audio/<audio_id>')
 def get_audio(audio_id):
-    audio_path = f"/tmp/audio_{audio_id}.mp3"
-    if os.path.exists(audio_path):
-        return send_file(audio_path, mimetype='audio/mpeg')
-    return '', 404
+    cached = tts_cache.source(audio_id)
+    if cached:
+        # Ids are content hashes, so cached audio never changes; conditional=True handles Range
+        source, mimetype = cached
+        return send_file(source, mimetype=mimetype, conditional=True, max_age=31536000)
+    if tts_worker.status(audio_id) == MISSING:
+        return '', 404
+    # Still being synthesized: relay it chunk by chunk as the backend produces it
+    stream = tts_cache.stream(audio_id)
+    if not stream:
+        return '', 404
+    mimetype, chunks = stream
+    return Response(chunks, mimetype=mimetype, headers={'Cache-Control': 'no-store'})
+
+@bp.route('/api/audio/<audio_id>/status')
+def audio_status(audio_id):
+    """For /api/chat clients polling a pending audio id"""
+    return jsonify({'audio_id': audio_id, 'status': tts_worker.status(audio_id)})
 
-@app.route('/api/clear', methods=['POST'])
-def clear():
-    session.clear()
-    return jsonify({'status': 'cleared'})
+@bp.route('/api/tts/stats')
+def tts_stats():
+    stats = tts_cache.stats()
+    stats['background'] = tts_worker.stats()
+    return jsonify(stats)
+
+app = Flask(__name__)
+app.secret_key = 'escape_room_chat'
+app.register_blueprint(bp)
 
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=5009)
\ No newline at end of file
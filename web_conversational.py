@@ -1,18 +1,19 @@
-from flask import Flask, request, jsonify, session
-import pandas as pd
-import google.generativeai as genai
-from dotenv import load_dotenv
-import json, re, os
+from flask import Blueprint, Flask, request, jsonify
+import json, re
+from catalog import get_catalog
+from intent_router import NEW_PUZZLE, NEXT_HINT, REPEAT, SMALL_TALK
+from chat_turns import render_chat_prompt
+from prompts import CompiledPrompt
+from services import get_intent_router, get_llm, get_single_flight, persona_session
 
-load_dotenv()
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-model = genai.GenerativeModel('gemini-1.5-flash')
-df = pd.read_csv('puzzles.csv')
+llm = get_llm()
+chat_flight = get_single_flight('chat')
+router = get_intent_router()
+catalog = get_catalog('puzzles.csv')
 
-app = Flask(__name__)
-app.secret_key = 'escape_room_chat'
+bp = Blueprint('conversational', __name__)
 
-@app.route('/')
+@bp.route('/')
 def index():
     return '''
 <!DOCTYPE html>
@@ -64,7 +65,7 @@ def index():
             addMessage(message, 'user');
             input.value = '';
             
-            fetch('/api/chat', {
+            fetch('api/chat', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ message: message })
@@ -88,7 +89,7 @@ def index():
         }
         
         function clearChat() {
-            fetch('/api/clear', { method: 'POST' });
+            fetch('api/clear', { method: 'POST' });
             document.getElementById('chatContainer').innerHTML = 
                 '<div class="message assistant-message">Hi! I\\'m here to help with your escape room puzzles. Tell me what you\\'re stuck on!</div>';
         }
@@ -103,85 +104,124 @@ def index():
 </html>
     '''
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    message = request.json.get('message', '')
+CHAT_PROMPT = """
+    You are a helpful escape room assistant. Available puzzles: $puzzles
     
-    if 'conversation' not in session:
-        session['conversation'] = []
-    if 'puzzle_progress' not in session:
-        session['puzzle_progress'] = {}
+    Previous conversation: $history
+    
+    User message: "$message"
+    
+    If user asks about a specific puzzle, return JSON: {"puzzle_match": true, "room": "exact name", "puzzle_name": "exact name", "response": "conversational response"}
+    If general chat, return JSON: {"puzzle_match": false, "response": "conversational response"}
+    """
+
+def build_chat_prompt(snapshot):
+    return CompiledPrompt(CHAT_PROMPT)
+
+catalog.register(build_chat_prompt)
+
+SMALL_TALK_REPLY = "I'm here to help with your escape room puzzles! Which one are you working on?"
+
+def next_hint_reply(state, puzzle):
+    """The next hint for a puzzle, advancing this session's progress on it"""
+    state['current_puzzle'] = puzzle.key
+    hints = puzzle.hints
+    hint_count = state['puzzle_progress'].get(puzzle.key, 0)
     
-    conversation = session['conversation']
+    if hint_count < len(hints):
+        hint = hints[hint_count]
+        state['puzzle_progress'][puzzle.key] = hint_count + 1
+        
+        response_text = f"Here's hint {hint_count + 1} for {puzzle.puzzle_name}: {hint}"
+        
+        if hint_count + 1 < len(hints):
+            response_text += "\\n\\nNeed another hint? Just ask!"
+        else:
+            response_text += "\\n\\nThat's all the hints I have for this puzzle!"
+        return response_text
+    return f"I've already given you all {len(hints)} hints for {puzzle.puzzle_name}. Try working through them step by step!"
+
+def local_reply(state, message, snapshot):
+    """(intent, reply) from this session's hint progress; a None reply means ask Gemini"""
+    intent = router.classify(message, snapshot, state.get('current_puzzle'))
+    puzzle = intent.puzzle
     
-    # Get conversational response from Gemini
-    puzzles = [f"Room: {r['room']}, Puzzle: {r['puzzle_name']}" for _, r in df.iterrows()]
-    history = "\\n".join([f"User: {c['user']}\\nAssistant: {c['assistant']}" for c in conversation[-3:]])
+    response_text = None
+    if intent.kind == SMALL_TALK:
+        response_text = SMALL_TALK_REPLY
+    elif intent.kind == REPEAT:
+        given = state['puzzle_progress'].get(puzzle.key, 0)
+        if given:
+            response_text = f"Here's hint {given} for {puzzle.puzzle_name} again: {puzzle.hints[given - 1]}"
+    elif intent.kind in (NEXT_HINT, NEW_PUZZLE):
+        response_text = next_hint_reply(state, puzzle)
     
-    prompt = f"""
-    You are a helpful escape room assistant. Available puzzles: {puzzles}
+    router.record(intent, response_text is not None)
+    return intent, response_text
+
+def chat_prompt(state, message, snapshot):
+    """The Gemini prompt, naming only the puzzles this message is likely about"""
+    history = "\\n".join([f"User: {c['user']}\\nAssistant: {c['assistant']}" for c in state['conversation'][-3:]])
+    return render_chat_prompt(snapshot, build_chat_prompt, message, state.get('current_puzzle'),
+                              fragment='puzzle_names', field='puzzles', history=history)
+
+def gemini_reply(state, snapshot, prompt):
+    """Let Gemini pick the puzzle (or just chat) from its JSON answer"""
+    llm_text = chat_flight.do(prompt, lambda: llm.generate_sync(prompt))
+    json_match = re.search(r'\\{.*\\}', llm_text, re.DOTALL)
     
-    Previous conversation: {history}
+    if json_match:
+        result = json.loads(json_match.group())
+        
+        if result.get('puzzle_match'):
+            puzzle = snapshot.puzzles.get(result.get('room'), result.get('puzzle_name'))
+            if puzzle:
+                return next_hint_reply(state, puzzle)
+            return result.get('response', "I couldn't find that puzzle.")
+        return result.get('response', "I'm here to help with puzzles!")
+    return "I'm here to help with your escape room puzzles!"
+
+@bp.route('/api/chat', methods=['POST'])
+def chat():
+    message = request.json.get('message', '')
+    snapshot = catalog.current
+    state = persona_session(bp.name)
     
-    User message: "{message}"
+    if 'conversation' not in state:
+        state['conversation'] = []
+    if 'puzzle_progress' not in state:
+        state['puzzle_progress'] = {}
+    if 'current_puzzle' not in state:
+        state['current_puzzle'] = None
     
-    If user asks about a specific puzzle, return JSON: {{"puzzle_match": true, "room": "exact name", "puzzle_name": "exact name", "response": "conversational response"}}
-    If general chat, return JSON: {{"puzzle_match": false, "response": "conversational response"}}
-    """
+    conversation = state['conversation']
     
     try:
-        response = model.generate_content(prompt)
-        json_match = re.search(r'\\{.*\\}', response.text, re.DOTALL)
-        
-        if json_match:
-            result = json.loads(json_match.group())
-            
-            if result.get('puzzle_match'):
-                room = result.get('room')
-                puzzle_name = result.get('puzzle_name')
-                puzzle_key = f"{room}_{puzzle_name}"
-                
-                # Get next hint for this puzzle
-                hint_count = session['puzzle_progress'].get(puzzle_key, 0)
-                
-                puzzle = df[(df['room'] == room) & (df['puzzle_name'] == puzzle_name)]
-                if not puzzle.empty:
-                    row = puzzle.iloc[0]
-                    hints = [row.get(f'hint{i}') for i in range(1, 5) if pd.notna(row.get(f'hint{i}'))]
-                    
-                    if hint_count < len(hints):
-                        hint = hints[hint_count]
-                        session['puzzle_progress'][puzzle_key] = hint_count + 1
-                        
-                        response_text = f"Here's hint {hint_count + 1} for {puzzle_name}: {hint}"
-                        
-                        if hint_count + 1 < len(hints):
-                            response_text += "\\n\\nNeed another hint? Just ask!"
-                        else:
-                            response_text += "\\n\\nThat's all the hints I have for this puzzle!"
-                    else:
-                        response_text = f"I've already given you all {len(hints)} hints for {puzzle_name}. Try working through them step by step!"
-                else:
-                    response_text = result.get('response', "I couldn't find that puzzle.")
-            else:
-                response_text = result.get('response', "I'm here to help with puzzles!")
-        else:
-            response_text = "I'm here to help with your escape room puzzles!"
+        # Hints, repeats and small talk are answered locally; Gemini only sees the rest
+        intent, response_text = local_reply(state, message, snapshot)
+        if response_text is None:
+            response_text = gemini_reply(state, snapshot, chat_prompt(state, message, snapshot))
         
         # Update conversation history
         conversation.append({'user': message, 'assistant': response_text})
-        session['conversation'] = conversation[-10:]  # Keep last 10 exchanges
+        state['conversation'] = conversation[-10:]  # Keep last 10 exchanges
         
         return jsonify({'response': response_text})
         
     except Exception as e:
         return jsonify({'response': 'Sorry, I had trouble understanding that. Can you try rephrasing?'})
 
-@app.route('/api/clear', methods=['POST'])
+@bp.route('/api/clear', methods=['POST'])
 def clear():
-    session['conversation'] = []
-    session['puzzle_progress'] = {}
+    state = persona_session(bp.name)
+    state['conversation'] = []
+    state['puzzle_progress'] = {}
+    state['current_puzzle'] = None
     return jsonify({'status': 'cleared'})
 
+app = Flask(__name__)
+app.secret_key = 'escape_room_chat'
+app.register_blueprint(bp)
+
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=5004)
\ No newline at end of file
@@ -1,18 +1,10 @@
-from flask import Flask, request, jsonify, session
-import pandas as pd
-import google.generativeai as genai
-from dotenv import load_dotenv
-import json, re, os
+from flask import Blueprint, Flask
+import re
+from chat_turns import ChatTurns
 
-load_dotenv()
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-model = genai.GenerativeModel('gemini-1.5-flash')
-df = pd.read_csv('puzzles.csv')
+bp = Blueprint('mystical', __name__)
 
-app = Flask(__name__)
-app.secret_key = 'escape_room_chat'
-
-@app.route('/')
+@bp.route('/')
 def index():
     return '''
 <!DOCTYPE html>
@@ -139,6 +131,7 @@ def index():
         <div id="voiceStatus"></div>
     </div>
 
+    <script src="chat_stream.js"></script>
     <script>
         function sendMessage() {
             const input = document.getElementById('messageInput');
@@ -150,15 +143,22 @@ def index():
             
             const typingDiv = addMessage('Consulting the ancient texts...', 'assistant typing');
             
-            fetch('/api/chat', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ message: message })
-            })
-            .then(response => response.json())
-            .then(data => {
-                typingDiv.remove();
-                addMessage(data.response, 'assistant');
+            let replyDiv = null;
+            
+            streamChat(message, {
+                token: text => {
+                    if (!replyDiv) {
+                        typingDiv.remove();
+                        replyDiv = addMessage('', 'assistant');
+                    }
+                    replyDiv.textContent += text;
+                    document.getElementById('chatContainer').scrollTop = document.getElementById('chatContainer').scrollHeight;
+                },
+                done: data => {
+                    typingDiv.remove();
+                    if (!replyDiv) replyDiv = addMessage('', 'assistant');
+                    replyDiv.textContent = data.response;
+                }
             })
             .catch(error => {
                 typingDiv.remove();
@@ -177,7 +177,7 @@ def index():
         }
         
         function clearChat() {
-            fetch('/api/clear', { method: 'POST' });
+            fetch('api/clear', { method: 'POST' });
             document.getElementById('chatContainer').innerHTML = 
                 '<div class="message assistant-message">Welcome, puzzle solver. I am your guide through these mysterious chambers. Which enigma has captured your attention?</div>';
         }
@@ -242,43 +242,18 @@ def index():
 </html>
     '''
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    message = request.json.get('message', '')
-    
-    if 'conversation' not in session:
-        session['conversation'] = []
-    if 'current_puzzle' not in session:
-        session['current_puzzle'] = None
-    if 'hint_count' not in session:
-        session['hint_count'] = 0
-    
-    conversation = session['conversation']
-    
-    puzzle_data = []
-    for _, row in df.iterrows():
-        hints = [row.get(f'hint{i}') for i in range(1, 5) if pd.notna(row.get(f'hint{i}'))]
-        puzzle_data.append({
-            'room': row['room'],
-            'name': row['puzzle_name'],
-            'description': row.get('physical_description', ''),
-            'hints': hints
-        })
-    
-    history = "\\n".join([f"User: {c['user']}\\nYou: {c['assistant']}" for c in conversation[-5:]])
-    
-    prompt = f"""
+CHAT_PROMPT = """
     You are a mysterious, wise escape room guide. Speak in an atmospheric, slightly mystical tone.
     
-    Available puzzles: {json.dumps(puzzle_data)}
+    Most relevant puzzles: $catalog
     
-    Current puzzle context: {session.get('current_puzzle')}
-    Hints given so far: {session.get('hint_count', 0)}
+    Current puzzle context: $current_puzzle
+    Hints given so far: $hint_count
     
     Recent conversation:
-    {history}
+    $history
     
-    User just said: "{message}"
+    User just said: "$message"
     
     Instructions:
     - Speak like a mysterious guide in an escape room
@@ -289,49 +264,20 @@ def chat():
     
     Respond as their mystical guide.
     """
-    
-    try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        for _, row in df.iterrows():
-            puzzle_name = row['puzzle_name'].lower()
-            room_name = row['room'].lower()
-            
-            if any(word in message.lower() for word in puzzle_name.split()) or room_name in message.lower():
-                puzzle_key = f"{row['room']}_{row['puzzle_name']}"
-                
-                if session.get('current_puzzle') != puzzle_key:
-                    session['current_puzzle'] = puzzle_key
-                    session['hint_count'] = 0
-                
-                if any(word in message.lower() for word in ['help', 'hint', 'stuck', 'how', 'what']):
-                    hints = [row.get(f'hint{i}') for i in range(1, 5) if pd.notna(row.get(f'hint{i}'))]
-                    
-                    if session['hint_count'] < len(hints):
-                        hint = hints[session['hint_count']]
-                        session['hint_count'] += 1
-                        
-                        response_text = f"Ah, the {row['puzzle_name']} calls to you. Listen carefully: {hint}"
-                        
-                        if session['hint_count'] < len(hints):
-                            response_text += " Should you require further guidance, speak again."
-                        else:
-                            response_text += " That is all the wisdom I can bestow upon this mystery."
-                break
-        
-        conversation.append({'user': message, 'assistant': response_text})
-        session['conversation'] = conversation[-10:]
-        
-        return jsonify({'response': response_text})
-        
-    except Exception as e:
-        return jsonify({'response': 'The mystical energies are disturbed. Speak your query once more.'})
 
-@app.route('/api/clear', methods=['POST'])
-def clear():
-    session.clear()
-    return jsonify({'status': 'cleared'})
+turns = ChatTurns(
+    bp.name, CHAT_PROMPT,
+    hint_format="Ah, the {puzzle} calls to you. Listen carefully: {hint}",
+    more_hints=" Should you require further guidance, speak again.",
+    last_hint=" That is all the wisdom I can bestow upon this mystery.",
+    small_talk_reply="The chambers are patient, seeker. Name the enigma before you and I shall guide you.",
+    error_reply='The mystical energies are disturbed. Speak your query once more.'
+)
+turns.add_routes(bp)
+
+app = Flask(__name__)
+app.secret_key = 'escape_room_chat'
+app.register_blueprint(bp)
 
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=5007)
\ No newline at end of file
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+EscapeRoom Assistant - Web Server
+Serves every persona from one process over a shared catalog, caches and API clients
+"""
+
+import os
+
+from flask import Flask, jsonify
+
+import web_app
+import web_chat
+import web_clean
+import web_conversational
+import web_escape_theme
+import web_simple
+from services import get_intent_router, get_llm, single_flight_stats
+
+# URL prefix -> module; each module's pages and /api routes are mounted under /<persona>/
+PERSONAS = {
+    'plain': web_clean,
+    'friendly': web_chat,
+    'mystical': web_escape_theme,
+    'conversational': web_conversational,
+    'simple': web_simple,
+}
+
+app = Flask(__name__)
+app.secret_key = os.getenv('FLASK_SECRET_KEY', 'escape_room_chat')
+
+# The puzzle lookup page stays at / so existing bookmarks and the desktop app keep working
+app.register_blueprint(web_app.bp)
+for persona, module in PERSONAS.items():
+    app.register_blueprint(module.bp, url_prefix=f'/{persona}')
+
+
+@app.route('/api/personas')
+def personas():
+    return jsonify({persona: f'/{persona}/' for persona in PERSONAS})
+
+
+@app.route('/api/llm/stats')
+def llm_stats():
+    return jsonify(get_llm().stats())
+
+
+@app.route('/api/router/stats')
+def router_stats():
+    return jsonify(get_intent_router().stats())
+
+
+@app.route('/api/coalescing/stats')
+def coalescing_stats():
+    return jsonify(single_flight_stats())
+
+
+if __name__ == '__main__':
+    port = int(os.getenv('PORT', '5001'))
+    print(f"Personas: {', '.join(f'http://127.0.0.1:{port}/{p}/' for p in PERSONAS)}")
+    app.run(host='127.0.0.1', port=port)
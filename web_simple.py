@@ -1,17 +1,27 @@
-from flask import Flask, request, jsonify
-import pandas as pd
-import google.generativeai as genai
-from dotenv import load_dotenv
-import json, re, os
+from flask import Blueprint, Flask, request, jsonify
+import json, re
+from catalog import get_catalog
+from prompts import CompiledPrompt
+from match_cache import canonical_query
+from services import get_llm, get_match_cache, get_single_flight
+from llm_client import LLMTimeout
 
-load_dotenv()
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-model = genai.GenerativeModel('gemini-1.5-flash')
-df = pd.read_csv('puzzles.csv')
+llm = get_llm()
+catalog = get_catalog('puzzles.csv')
+match_cache = get_match_cache('puzzles.csv')
+match_flight = get_single_flight('match')
 
-app = Flask(__name__)
+# Catalog first so it forms a static prefix that can be context-cached
+MATCH_PROMPT = 'Puzzles: $puzzles\nMatch \'$query\' to one of the puzzles above. Return JSON: {"room": "name", "puzzle_name": "name"}'
+
+def build_match_prompt(snapshot):
+    return CompiledPrompt(MATCH_PROMPT, puzzles=snapshot.fragments['puzzle_names'])
+
+catalog.register(build_match_prompt)
 
-@app.route('/')
+bp = Blueprint('simple', __name__)
+
+@bp.route('/')
 def index():
     return '''
 <!DOCTYPE html>
@@ -62,7 +72,7 @@ def index():
             resultsDiv.style.display = 'block';
             resultsDiv.innerHTML = '<div class="loading"><p>Finding your puzzle...</p></div>';
             
-            fetch('/api/query', {
+            fetch('api/query', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ query: query })
@@ -110,29 +120,53 @@ def index():
 </html>
     '''
 
-@app.route('/api/query', methods=['POST'])
+def ask_gemini(snapshot, q):
+    prefix, prompt = snapshot.get(build_match_prompt).render_parts(query=q)
+    try:
+        response_text = llm.generate_sync(prompt, prefix=prefix)
+        match = re.search(r'\{.*\}', response_text)
+        if match:
+            result = json.loads(match.group())
+            return result.get('room'), result.get('puzzle_name')
+    except (LLMTimeout, ValueError) as e:
+        # A late or malformed answer is no match, not a 500
+        print(f"Gemini match error: {e}")
+    return None, None
+
+@bp.route('/api/query', methods=['POST'])
 def query():
     q = request.json.get('query', '')
-    puzzles = [f"Room: {r['room']}, Puzzle: {r['puzzle_name']}" for _, r in df.iterrows()]
+    snapshot = catalog.current
+    room, name = snapshot.index.best_match(q)
+    from_gemini = False
     
-    response = model.generate_content(f"Match '{q}' to: {puzzles}. Return JSON: {{\"room\": \"name\", \"puzzle_name\": \"name\"}}")
-    match = re.search(r'\{.*\}', response.text)
-    if match:
-        result = json.loads(match.group())
-        room, name = result.get('room'), result.get('puzzle_name')
-        
-        puzzle = df[(df['room'] == room) & (df['puzzle_name'] == name)]
-        if not puzzle.empty:
-            row = puzzle.iloc[0]
-            hints = [row.get(f'hint{i}') for i in range(1, 5) if pd.notna(row.get(f'hint{i}'))]
-            return jsonify({
-                'room': room,
-                'puzzle_name': name,
-                'description': row.get('physical_description', ''),
-                'hints': hints
-            })
+    if not room:
+        room, name = match_cache.get(q) or (None, None)
+    
+    if not room:
+        from_gemini = True
+        key = (snapshot.fingerprint, canonical_query(q) or q.strip().lower())
+        room, name = match_flight.do(key, lambda: ask_gemini(snapshot, q))
+    
+    puzzle = snapshot.puzzles.get(room, name)
+    if puzzle:
+        if from_gemini:
+            match_cache.put(q, room, name)
+        return jsonify({
+            'room': room,
+            'puzzle_name': name,
+            'description': puzzle.physical_description,
+            'hints': list(puzzle.hints)
+        })
     
     return jsonify({'error': 'No puzzle found'})
 
+@bp.route('/api/cache/stats')
+def cache_stats():
+    return jsonify(match_cache.stats())
+
+app = Flask(__name__)
+app.register_blueprint(bp)
+
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=5003)
\ No newline at end of file